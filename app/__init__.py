@@ -22,7 +22,9 @@ def create_app():
     UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 
     # --- Initialize Flask app ---
+    from app.storage import UploadRequest
     app = Flask(__name__, static_folder="static", template_folder="templates")
+    app.request_class = UploadRequest  # streams file uploads to disk
 
     # --- App Config ---
     app.config["SECRET_KEY"] = os.environ.get("MYSHOP_SECRET", "dev-secret-key")
@@ -30,7 +32,32 @@ def create_app():
         "DATABASE_URL", f"sqlite:///{BASE_DIR/'myshop.db'}"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # --- Database engine (see app/engine.py) ---
+    app.config["DB_ENGINE_TUNING"] = os.environ.get("DB_ENGINE_TUNING", "True") == "True"
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))
+    app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))  # seconds
+    app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # seconds
+    app.config["DB_POOL_PRE_PING"] = os.environ.get("DB_POOL_PRE_PING", "True") == "True"
+    app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    from app.engine import engine_options
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    # Apply pending migrations at startup; turn off and run `flask db-upgrade`
+    # on deploy when several workers start at once
+    app.config["DB_AUTO_MIGRATE"] = os.environ.get("DB_AUTO_MIGRATE", "True") == "True"
+    # Account promoted to admin when migration 0002 adds user.is_admin to an
+    # existing database; unset, nobody is (grant it with `flask set-admin`)
+    app.config["LEGACY_ADMIN_EMAIL"] = os.environ.get("LEGACY_ADMIN_EMAIL")
     app.config["UPLOAD_FOLDER"] = str(UPLOAD_FOLDER)
+    # Uploads in flight, outside the static tree so unvalidated files are never
+    # served; keep it on the uploads' filesystem so storing one is a rename
+    app.config["UPLOAD_TMP_FOLDER"] = os.environ.get(
+        "UPLOAD_TMP_FOLDER", os.path.join(app.instance_path, "incoming-uploads")
+    )
     app.config["MAX_CONTENT_LENGTH"] = 8 * 1024 * 1024  # 8MB
 
     # --- Flask-Mail Config ---
@@ -45,10 +72,44 @@ def create_app():
     )
     app.config["MAIL_DEBUG"] = True
 
+    # --- Outbound mail queue ---
+    app.config["MAIL_QUEUE_WORKER"] = os.environ.get("MAIL_QUEUE_WORKER", "True") == "True"
+    app.config["MAIL_QUEUE_BATCH_SIZE"] = int(os.environ.get("MAIL_QUEUE_BATCH_SIZE", 50))
+    app.config["MAIL_QUEUE_MAX_ATTEMPTS"] = int(os.environ.get("MAIL_QUEUE_MAX_ATTEMPTS", 6))
+    app.config["MAIL_QUEUE_RETRY_BASE"] = int(os.environ.get("MAIL_QUEUE_RETRY_BASE", 30))  # seconds
+    app.config["MAIL_QUEUE_POLL_SECONDS"] = int(os.environ.get("MAIL_QUEUE_POLL_SECONDS", 15))
+
+    # --- Inventory ---
+    app.config["STOCK_RESERVATION_MINUTES"] = int(os.environ.get("STOCK_RESERVATION_MINUTES", 15))
+
+    # --- Pre-rendered captcha pool ---
+    app.config["CAPTCHA_POOL_SIZE"] = int(os.environ.get("CAPTCHA_POOL_SIZE", 200))
+
+    # --- Page cache for anonymous catalog pages ---
+    app.config["CACHE_ENABLED"] = os.environ.get("CACHE_ENABLED", "True") == "True"
+    app.config["CACHE_DEFAULT_TTL"] = int(os.environ.get("CACHE_DEFAULT_TTL", 300))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+    app.config["CACHE_REDIS_URL"] = os.environ.get("CACHE_REDIS_URL")  # optional shared backend
+    app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))  # 0 disables
+
+    # --- Instrumentation: request/SQL timing, slow-query log, /metrics ---
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "True") == "True"
+    app.config["SLOW_QUERY_MS"] = int(os.environ.get("SLOW_QUERY_MS", 200))  # 0 disables the log
+    # Scrapers send it as a bearer token. Unset, /metrics is not served at all:
+    # behind a same-host reverse proxy every request comes from 127.0.0.1, so
+    # the client address can't tell a local scraper from the internet
+    app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+
     # --- Initialize extensions ---
     db.init_app(app)
     login_manager.init_app(app)
     mail.init_app(app)
+    from app.cache import cache
+    cache.init_app(app)
+    from app.captcha import captcha_pool
+    captcha_pool.init_app(app)
+    from app.metrics import metrics
+    metrics.init_app(app)
     login_manager.login_view = "login"
     login_manager.login_message_category = "info"
 
@@ -56,19 +117,64 @@ def create_app():
     global serializer
     serializer = URLSafeTimedSerializer(app.config["SECRET_KEY"])
 
-    # --- User loader for Flask-Login ---
-    from app.models import User
+    # --- User loader for Flask-Login (served from the identity cache) ---
+    from app.identity import load_cached_user
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
 
     # --- Register all routes ---
     from app import routes
     routes.register_routes(app)
 
-    # --- Create database tables if they don't exist ---
+    # --- Start the mail worker with the first request (not for CLI commands) ---
+    if app.config["MAIL_QUEUE_WORKER"]:
+        from app.mailqueue import start_worker
+
+        @app.before_request
+        def ensure_mail_worker():
+            start_worker(app)
+
+    # --- Content-addressed uploads never change, so let clients cache them forever ---
+    from flask import request
+    from app.storage import is_hashed_name
+
+    @app.after_request
+    def cache_hashed_uploads(response):
+        prefix = "/static/uploads/"
+        if response.status_code in (200, 304) and request.path.startswith(prefix) \
+                and is_hashed_name(request.path[len(prefix):]):
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+    # --- Template helpers ---
+    from app.images import image_url
+    app.jinja_env.globals["image_url"] = image_url
+    from app.catalog import spec_args
+    app.jinja_env.globals["spec_args"] = spec_args
+
+    # --- Register CLI commands ---
+    from app.cli import register_commands
+    register_commands(app)
+
+    # --- Bring the schema up to date (see app/migrate.py) ---
     with app.app_context():
-        db.create_all()
+        from app.engine import configure_engine
+        configure_engine(db.engine, app.config)
+        if app.config["DB_AUTO_MIGRATE"]:
+            from app.migrate import upgrade_database
+            upgrade_database(log=lambda name: app.logger.info("Applied migration %s", name))
+
+        # --- Full-text search index ---
+        from app.search import init_search
+        init_search()
+
+        # --- Dashboard rollups ---
+        from app.rollups import init_rollups
+        init_rollups()
 
     return app
@@ -0,0 +1,163 @@
+# app/cache.py
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, session, make_response
+from flask_login import current_user
+
+# ===================== PAGE CACHE =====================
+# Rendered pages for anonymous visitors are cached under their path and
+# query string plus the current version of each tag they depend on
+# ("catalog", "product:<id>"). Write routes bump a tag's version, which
+# makes every dependent entry unreachable at once; stale entries then age
+# out of the LRU. The in-process backend is per worker; set
+# CACHE_REDIS_URL to share entries and invalidations between processes.
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry TTL. Tag versions are never evicted."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisBackend:
+    """Shared backend; needs the optional `redis` package."""
+
+    def __init__(self, url, prefix="myshop:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+class PageCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.enabled = False
+        self.default_ttl = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("CACHE_ENABLED", True)
+        self.default_ttl = app.config.get("CACHE_DEFAULT_TTL", 300)
+        redis_url = app.config.get("CACHE_REDIS_URL")
+        if redis_url:
+            self.backend = RedisBackend(redis_url)
+        else:
+            self.backend = MemoryBackend(app.config.get("CACHE_MAX_ENTRIES", 1024))
+
+    def _versioned_key(self, key, tags):
+        versions = ".".join(str(self.backend.get_counter(f"tag:{t}")) for t in tags)
+        return f"{key}@{versions}"
+
+    def get_or_set(self, key, tags, producer, ttl=None):
+        """Fragment cache: return the cached value for key/tags or store producer()."""
+        if not self.enabled:
+            return producer()
+        full_key = self._versioned_key(key, tags)
+        value = self.backend.get(full_key)
+        if value is None:
+            value = producer()
+            self.backend.set(full_key, value, ttl or self.default_ttl)
+        return value
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.incr(f"tag:{tag}")
+
+    def cached_page(self, tags, ttl=None):
+        """Cache a view's GET response for anonymous visitors.
+
+        `tags` is called with the view's keyword arguments and returns the
+        tags whose invalidation should drop the page.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (not self.enabled or request.method != "GET"
+                        or current_user.is_authenticated or session.get("_flashes")):
+                    return view(*args, **kwargs)
+
+                full_key = self._versioned_key(f"page:{request.full_path}", tags(**kwargs))
+                cached = self.backend.get(full_key)
+                if cached is not None:
+                    body, mimetype = cached
+                    response = make_response(body)
+                    response.mimetype = mimetype
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.backend.set(full_key, (response.get_data(), response.mimetype), ttl or self.default_ttl)
+                    response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+
+cache = PageCache()
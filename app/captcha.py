@@ -0,0 +1,85 @@
+# app/captcha.py
+import io
+import queue
+import random
+import string
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+# ===================== CAPTCHA POOL =====================
+# Captchas are rendered ahead of time by a background thread so the
+# /captcha-image request only pops a ready (text, png) pair off a queue.
+# Each pair is handed out once. If the pool runs dry under a burst, one
+# is rendered inline.
+
+CAPTCHA_LENGTH = 5
+CAPTCHA_SIZE = (200, 70)
+
+
+def _load_font():
+    try:
+        return ImageFont.truetype("arial.ttf", 50)
+    except OSError:
+        return ImageFont.load_default()
+
+
+FONT = _load_font()  # loaded once per process, not per request
+
+
+def random_text():
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=CAPTCHA_LENGTH))
+
+
+def render_captcha(text):
+    img = Image.new('RGB', CAPTCHA_SIZE, color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.text((20, 10), text, fill=(50, 50, 50), font=FONT)
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+class CaptchaPool:
+    def __init__(self, size=200):
+        self.size = size
+        self._queue = queue.Queue(maxsize=size)
+        self._refill = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.size = app.config.get("CAPTCHA_POOL_SIZE", self.size)
+        self._queue = queue.Queue(maxsize=self.size)
+
+    def _run(self):
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            while not self._queue.full():
+                text = random_text()
+                try:
+                    self._queue.put_nowait((text, render_captcha(text)))
+                except queue.Full:
+                    break
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="captcha-pool", daemon=True)
+                    self._thread.start()
+
+    def take(self):
+        """Return a fresh (text, png_bytes) pair."""
+        self._ensure_worker()
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            text = random_text()
+            item = (text, render_captcha(text))
+        if self._queue.qsize() < self.size // 2:
+            self._refill.set()
+        return item
+
+
+captcha_pool = CaptchaPool()
@@ -0,0 +1,120 @@
+# app/carts.py
+from collections import namedtuple
+from datetime import datetime
+from flask import session
+from app import db
+from app.models import Cart, Product
+from app.upsert import upsert_add_many, upsert_set_many
+
+# ===================== CART OPERATIONS =====================
+# Applies any mix of quantity sets, additions and removals for one user
+# with a fixed number of statements, using INSERT ... ON CONFLICT on the
+# (user_id, product_id) unique constraint.
+
+
+def _set_quantities(user_id, quantities):
+    """Set absolute quantities, inserting missing lines."""
+    upsert_set_many(Cart, ["user_id", "product_id"],
+                    [dict(user_id=user_id, product_id=pid, quantity=qty, added_at=datetime.utcnow())
+                     for pid, qty in quantities.items()], ["quantity"])
+
+
+def _normalize(set_qty, add_qty, remove):
+    set_qty = {int(k): int(v) for k, v in (set_qty or {}).items()}
+    add_qty = {int(k): int(v) for k, v in (add_qty or {}).items() if int(v) > 0}
+    remove = {int(pid) for pid in (remove or [])}
+    remove |= {pid for pid, qty in set_qty.items() if qty <= 0}
+    set_qty = {pid: qty for pid, qty in set_qty.items() if pid not in remove}
+    add_qty = {pid: qty for pid, qty in add_qty.items() if pid not in remove}
+    return set_qty, add_qty, remove
+
+
+def apply_cart_changes(user_id, set_qty=None, add_qty=None, remove=None):
+    """Stage cart changes for a user; the caller commits.
+
+    `set_qty` and `add_qty` map product_id -> quantity. A set quantity of
+    zero or less removes the line. Unknown product ids are ignored.
+    """
+    set_qty, add_qty, remove = _normalize(set_qty, add_qty, remove)
+
+    wanted = set(set_qty) | set(add_qty)
+    if wanted:
+        known = {pid for (pid,) in db.session.query(Product.id).filter(Product.id.in_(wanted))}
+        set_qty = {pid: qty for pid, qty in set_qty.items() if pid in known}
+        add_qty = {pid: qty for pid, qty in add_qty.items() if pid in known}
+
+    if remove:
+        Cart.query.filter(Cart.user_id == user_id, Cart.product_id.in_(remove))\
+            .delete(synchronize_session=False)
+    _set_quantities(user_id, set_qty)
+    upsert_add_many(Cart, ["user_id", "product_id"],
+                    [dict(user_id=user_id, product_id=pid, quantity=qty) for pid, qty in add_qty.items()])
+
+
+def _summary(rows):
+    items = [dict(product_id=pid, quantity=qty, name=name, price=price) for pid, qty, name, price in rows]
+    return {
+        "items": items,
+        "count": sum(i["quantity"] for i in items),
+        "total": sum((i["price"] or 0) * i["quantity"] for i in items),
+    }
+
+
+def cart_summary(user_id):
+    """Return the user's cart lines and total from a single joined query."""
+    rows = db.session.query(Cart.product_id, Cart.quantity, Product.name, Product.price)\
+        .join(Product, Product.id == Cart.product_id)\
+        .filter(Cart.user_id == user_id).order_by(Cart.added_at).all()
+    return _summary(rows)
+
+
+# ===================== ANONYMOUS CART =====================
+# Visitors who are not logged in keep their cart in the signed session
+# cookie as {"<product_id>": quantity}. Adding and updating lines touches
+# no table at all; the lines are merged into Cart in one upsert when the
+# visitor logs in.
+
+SESSION_KEY = "cart"
+MAX_SESSION_LINES = 50
+
+SessionCartItem = namedtuple("SessionCartItem", "product quantity")
+
+
+def session_cart():
+    return {int(pid): qty for pid, qty in session.get(SESSION_KEY, {}).items()}
+
+
+def apply_session_changes(set_qty=None, add_qty=None, remove=None):
+    """Apply the same changes as apply_cart_changes() to the session cart."""
+    set_qty, add_qty, remove = _normalize(set_qty, add_qty, remove)
+    cart = session_cart()
+    for pid in remove:
+        cart.pop(pid, None)
+    for pid, qty in set_qty.items():
+        if pid in cart or len(cart) < MAX_SESSION_LINES:
+            cart[pid] = qty
+    for pid, qty in add_qty.items():
+        if pid in cart or len(cart) < MAX_SESSION_LINES:
+            cart[pid] = cart.get(pid, 0) + qty
+    session[SESSION_KEY] = {str(pid): qty for pid, qty in cart.items()}
+
+
+def session_cart_items():
+    """Cart lines for the session cart, with products loaded in one query."""
+    cart = session_cart()
+    if not cart:
+        return []
+    products = Product.query.filter(Product.id.in_(cart)).all()
+    return [SessionCartItem(p, cart[p.id]) for p in products]
+
+
+def session_cart_summary():
+    return _summary((item.product.id, item.quantity, item.product.name, item.product.price)
+                    for item in session_cart_items())
+
+
+def merge_session_cart(user_id):
+    """Move the session cart into the user's Cart rows; the caller commits."""
+    cart = session.pop(SESSION_KEY, None)
+    if cart:
+        apply_cart_changes(user_id, add_qty=cart)
@@ -0,0 +1,260 @@
+# app/catalog.py
+import math
+import re
+from collections import namedtuple
+from sqlalchemy import select, insert, delete, update, exists, func
+from app import db
+from app.models import Product, Category, ProductCategory, ProductSpec
+from app.pagination import keyset_page, PER_PAGE
+from app.upsert import insert_missing
+
+# ===================== CATALOG STRUCTURE =====================
+# Product.categories / Product.specifications stay the text the admin
+# typed. Whenever they change, sync_product_catalog() mirrors them into
+# Category / ProductCategory / ProductSpec rows, so category pages, facet
+# counts and spec filters are index lookups instead of LIKE scans over
+# the product table.
+
+MAX_FACET_NAMES = 8
+MAX_FACET_VALUES = 10
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:120]
+
+
+def parse_categories(text):
+    """{slug: name} for a comma-separated category string, first spelling wins."""
+    categories = {}
+    for name in (text or "").split(","):
+        name = name.strip()[:100]
+        slug = slugify(name)
+        if slug and slug not in categories:
+            categories[slug] = name
+    return categories
+
+
+def parse_specifications(text):
+    """[(name, value)] from "Name: Value" lines; a line without a colon becomes a name with no value."""
+    specs = []
+    for line in (text or "").splitlines():
+        name, _, value = line.partition(":")
+        if name.strip():
+            specs.append((name.strip()[:100], value.strip()[:255]))
+    return specs
+
+
+def _category_ids(conn, categories):
+    """Map slugs to Category ids, creating the missing categories."""
+    if not categories:
+        return {}
+    insert_missing(conn, Category, ["slug"], [{"slug": slug, "name": name} for slug, name in categories.items()])
+    return dict(conn.execute(select(Category.slug, Category.id).where(Category.slug.in_(categories))).all())
+
+
+def _bump_counts(conn, category_ids, delta):
+    if category_ids:
+        conn.execute(update(Category).where(Category.id.in_(category_ids))
+                     .values(product_count=Category.product_count + delta))
+
+
+def sync_product_catalog(product):
+    """Stage the category links and spec rows for a flushed product; the caller commits."""
+    conn = db.session.connection()
+    wanted = set(_category_ids(conn, parse_categories(product.categories)).values())
+    current = set(conn.scalars(select(ProductCategory.category_id).where(ProductCategory.product_id == product.id)))
+
+    removed, added = current - wanted, wanted - current
+    if removed:
+        conn.execute(delete(ProductCategory).where(ProductCategory.product_id == product.id,
+                                                   ProductCategory.category_id.in_(removed)))
+    if added:
+        conn.execute(insert(ProductCategory), [dict(product_id=product.id, category_id=cid,
+                                                    created_at=product.created_at) for cid in added])
+    _bump_counts(conn, removed, -1)
+    _bump_counts(conn, added, 1)
+
+    conn.execute(delete(ProductSpec).where(ProductSpec.product_id == product.id))
+    specs = parse_specifications(product.specifications)
+    if specs:
+        conn.execute(insert(ProductSpec), [dict(product_id=product.id, position=i, name=name, value=value)
+                                           for i, (name, value) in enumerate(specs)])
+
+
+def remove_product_catalog(product_id):
+    """Stage removal of a product's links and specs before the product is deleted."""
+    conn = db.session.connection()
+    category_ids = set(conn.scalars(select(ProductCategory.category_id).where(ProductCategory.product_id == product_id)))
+    conn.execute(delete(ProductCategory).where(ProductCategory.product_id == product_id))
+    conn.execute(delete(ProductSpec).where(ProductSpec.product_id == product_id))
+    _bump_counts(conn, category_ids, -1)
+
+
+def rebuild_catalog(conn, chunk=5000):
+    """Recreate every category link and spec row from the product text columns."""
+    conn.execute(delete(ProductSpec))
+    conn.execute(delete(ProductCategory))
+
+    products = conn.execute(select(Product.id, Product.created_at, Product.categories, Product.specifications)).all()
+    names = {}
+    for row in products:
+        for slug, name in parse_categories(row.categories).items():
+            names.setdefault(slug, name)
+    ids = {}
+    slugs = list(names)
+    for i in range(0, len(slugs), 500):
+        ids.update(_category_ids(conn, {slug: names[slug] for slug in slugs[i:i + 500]}))
+
+    links, specs = [], []
+    for row in products:
+        links += [dict(product_id=row.id, category_id=ids[slug], created_at=row.created_at)
+                  for slug in parse_categories(row.categories)]
+        specs += [dict(product_id=row.id, position=i, name=name, value=value)
+                  for i, (name, value) in enumerate(parse_specifications(row.specifications))]
+    for model, rows in ((ProductCategory, links), (ProductSpec, specs)):
+        for i in range(0, len(rows), chunk):
+            conn.execute(insert(model), rows[i:i + chunk])
+
+    counts = select(func.count()).where(ProductCategory.category_id == Category.id).scalar_subquery()
+    conn.execute(update(Category).values(product_count=counts))
+
+
+# ===================== LISTING FILTERS =====================
+# Price range, discount and rating filters plus the sort order, read from the
+# query string. Every sort is a (column, id) keyset over a composite index
+# on product, so a page costs the same however deep the shopper scrolls.
+# Prices are the list price; discount_price is the amount taken off.
+
+# sort name -> (product column, ascending, label)
+SORTS = {
+    "newest": ("created_at", False, "Newest"),
+    "price_asc": ("price", True, "Price: low to high"),
+    "price_desc": ("price", False, "Price: high to low"),
+    "popular": ("sales_count", False, "Best selling"),
+    "rating": ("rating_avg", False, "Top rated"),
+}
+DEFAULT_SORT = "newest"
+
+
+class ListingFilters(namedtuple("ListingFilters", "min_price max_price discounted min_rating sort")):
+
+    def query_args(self):
+        """The non-default filters as url_for() arguments, for links that keep them."""
+        args = {name: value for name in ("min_price", "max_price", "min_rating")
+                if (value := getattr(self, name)) is not None}
+        if self.discounted:
+            args["discounted"] = 1
+        if self.sort != DEFAULT_SORT:
+            args["sort"] = self.sort
+        return args
+
+
+def parse_listing_filters(args):
+    """ListingFilters from request.args; values that don't parse are ignored."""
+    def number(name, low=0.0, high=math.inf):
+        try:
+            value = float(args.get(name, ""))
+        except ValueError:
+            return None
+        return value if low <= value <= high else None
+
+    sort = args.get("sort", DEFAULT_SORT)
+    return ListingFilters(
+        min_price=number("min_price"),
+        max_price=number("max_price"),
+        discounted=args.get("discounted") in ("1", "on", "true"),
+        min_rating=number("min_rating", high=5.0),
+        sort=sort if sort in SORTS else DEFAULT_SORT,
+    )
+
+
+def filter_products(query, filters):
+    """Apply the price, discount and rating filters (not the sort) to a Product query."""
+    if filters.min_price is not None:
+        query = query.filter(Product.price >= filters.min_price)
+    if filters.max_price is not None:
+        query = query.filter(Product.price <= filters.max_price)
+    if filters.discounted:
+        query = query.filter(Product.discount_price > 0)
+    if filters.min_rating is not None:
+        query = query.filter(Product.rating_avg >= filters.min_rating)
+    return query
+
+
+def listing_products(filters, cursor=None, per_page=PER_PAGE):
+    """(products, next_cursor) for the product listing, filtered and sorted."""
+    column, ascending, _ = SORTS[filters.sort]
+    return keyset_page(filter_products(Product.query, filters), Product, cursor, per_page,
+                       columns=(getattr(Product, column), Product.id), ascending=ascending)
+
+
+# ===================== CATEGORY LISTINGS =====================
+
+def parse_spec_filters(values):
+    """[(name, value)] from ?spec=Name:Value query arguments."""
+    filters = []
+    for raw in values:
+        name, sep, value = raw.partition(":")
+        if sep and name.strip() and (name.strip(), value.strip()) not in filters:
+            filters.append((name.strip(), value.strip()))
+    return filters
+
+
+def spec_args(specs, add=None, exclude=None):
+    """?spec= values for a link from the current filters, with one added or removed."""
+    pairs = [pair for pair in specs if pair != exclude] + ([add] if add else [])
+    return [f"{name}:{value}" for name, value in pairs]
+
+
+def _filter_specs(stmt, specs):
+    for name, value in specs:
+        stmt = stmt.where(exists().where(ProductSpec.product_id == ProductCategory.product_id,
+                                         ProductSpec.name == name, ProductSpec.value == value))
+    return stmt
+
+
+def category_products(category_id, cursor=None, specs=(), filters=None, per_page=PER_PAGE):
+    """(products, next_cursor) for a category, newest first, read off ix_product_category_listing.
+
+    `filters` narrows by price, discount and rating; its sort is not used.
+    """
+    query = Product.query.join(ProductCategory, ProductCategory.product_id == Product.id)\
+        .filter(ProductCategory.category_id == category_id)
+    query = _filter_specs(query, specs)
+    if filters:
+        query = filter_products(query, filters)
+    return keyset_page(query, Product, cursor, per_page,
+                       columns=(ProductCategory.created_at, ProductCategory.product_id))
+
+
+def category_facets(category_id, specs=()):
+    """Counts of other categories and of spec values among the matching products.
+
+    Returns plain data so it can go in the fragment cache:
+    {"categories": [(slug, name, count)], "specs": [(name, [(value, count)])]}.
+    """
+    matching = _filter_specs(select(ProductCategory.product_id)
+                             .where(ProductCategory.category_id == category_id), specs)
+
+    other = db.aliased(ProductCategory)
+    related = db.session.execute(
+        select(Category.slug, Category.name, func.count())
+        .select_from(other).join(Category, Category.id == other.category_id)
+        .where(other.product_id.in_(matching), other.category_id != category_id)
+        .group_by(Category.id, Category.slug, Category.name)
+        .order_by(func.count().desc(), Category.name).limit(20)
+    ).all()
+
+    spec_counts = {}
+    for name, value, count in db.session.execute(
+            select(ProductSpec.name, ProductSpec.value, func.count())
+            .where(ProductSpec.product_id.in_(matching), ProductSpec.value != "")
+            .group_by(ProductSpec.name, ProductSpec.value)
+            .order_by(ProductSpec.name, func.count().desc())):
+        values = spec_counts.setdefault(name, [])
+        if len(values) < MAX_FACET_VALUES:
+            values.append((value, count))
+    # Names shared by the most products first; unique-per-product specs are no use as filters
+    facets = sorted(((name, values) for name, values in spec_counts.items() if len(values) > 1 or values[0][1] > 1),
+                    key=lambda item: -sum(n for _, n in item[1]))
+    return {"categories": [tuple(row) for row in related], "specs": facets[:MAX_FACET_NAMES]}
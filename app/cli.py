@@ -0,0 +1,133 @@
+# app/cli.py
+import time
+import click
+
+
+def register_commands(app):
+
+    # ===================== SEARCH INDEX =====================
+    @app.cli.command("rebuild-search")
+    def rebuild_search():
+        """Rebuild the product full-text search index."""
+        from app.search import rebuild_search_index
+        rebuild_search_index()
+        click.echo("Search index rebuilt.")
+
+
+    # ===================== DASHBOARD ROLLUPS =====================
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_command():
+        """Recompute the sales rollups and product rating, comment and sales aggregates."""
+        from app.cache import cache
+        from app.rollups import rebuild_rollups
+        rebuild_rollups()
+        cache.invalidate("catalog")
+        click.echo("Rollups rebuilt.")
+
+
+    # ===================== CATALOG =====================
+    @app.cli.command("rebuild-catalog")
+    def rebuild_catalog_command():
+        """Recreate category links and spec rows from the product text columns."""
+        from app import db
+        from app.catalog import rebuild_catalog
+        with db.engine.begin() as conn:
+            rebuild_catalog(conn)
+        click.echo("Catalog rebuilt.")
+
+
+    # ===================== MAIL QUEUE =====================
+    @app.cli.command("send-mail")
+    @click.option("--once", is_flag=True, help="Drain due messages and exit.")
+    def send_mail(once):
+        """Deliver queued outbox emails (run as a separate worker process)."""
+        from app.mailqueue import deliver_pending
+        while True:
+            sent = deliver_pending(app)
+            if sent:
+                click.echo(f"Sent {sent} email(s).")
+            elif once:
+                break
+            else:
+                time.sleep(app.config["MAIL_QUEUE_POLL_SECONDS"])
+
+
+    # ===================== IMAGE VARIANTS =====================
+    @app.cli.command("generate-thumbnails")
+    def generate_thumbnails():
+        """Generate resized WebP variants for every existing upload."""
+        import os
+        from app.images import generate_variants
+        folder = app.config["UPLOAD_FOLDER"]
+        for name in sorted(os.listdir(folder)):
+            if os.path.isfile(os.path.join(folder, name)):
+                try:
+                    generate_variants(folder, name)
+                    click.echo(f"OK    {name}")
+                except Exception as e:
+                    click.echo(f"SKIP  {name}: {e}")
+
+
+    # ===================== INVENTORY =====================
+    @app.cli.command("release-reservations")
+    def release_expired_reservations():
+        """Return stock held by expired checkout reservations."""
+        from app import db
+        from app.cache import cache
+        from app.inventory import release_reservations
+        released = release_reservations(expired_only=True)
+        db.session.commit()
+        cache.invalidate(*(f"product:{pid}" for pid in released))
+        click.echo(f"Released {sum(released.values())} unit(s) across {len(released)} product(s).")
+
+
+    # ===================== ACCOUNTS =====================
+    @app.cli.command("set-admin")
+    @click.argument("email")
+    @click.option("--revoke", is_flag=True, help="Remove admin rights instead of granting them.")
+    def set_admin(email, revoke):
+        """Grant (or revoke) dashboard access for a user."""
+        from app import db
+        from app.models import User
+        from app.identity import forget_user
+        user = User.query.filter_by(email=email.strip().lower()).first()
+        if user is None:
+            raise click.ClickException(f"No user with email {email}.")
+        user.is_admin = not revoke
+        db.session.commit()
+        forget_user(user.id)
+        click.echo(f"{user.email} is {'now' if user.is_admin else 'no longer'} an admin.")
+
+
+    # ===================== SCHEMA MIGRATIONS =====================
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Apply pending schema migrations from app/migrations/."""
+        from app.migrate import upgrade_database
+        applied = upgrade_database(log=lambda name: click.echo(f"Applied {name}"))
+        click.echo(f"{len(applied)} migration(s) applied." if applied else "Database is up to date.")
+
+
+    @app.cli.command("db-status")
+    def db_status():
+        """List applied and pending schema migrations."""
+        from app.migrate import pending_migrations, available_migrations
+        pending = {version for version, _, _ in pending_migrations()}
+        for version, name, _ in available_migrations():
+            click.echo(f"{'pending' if version in pending else 'applied':8} {name}")
+
+
+    @app.cli.command("check-query-plans")
+    @click.option("--verbose", is_flag=True, help="Print the full plan of every query.")
+    def check_query_plans_command(verbose):
+        """Fail if any hot query would scan a whole table."""
+        from app.queryplan import check_query_plans
+        failed = 0
+        for name, (details, scans) in check_query_plans().items():
+            failed += bool(scans)
+            click.echo(f"{'FULL SCAN' if scans else 'ok':9} {name}" + (f": {'; '.join(scans)}" if scans else ""))
+            if verbose:
+                for line in details:
+                    click.echo(f"          {line}")
+        if failed:
+            raise click.ClickException(f"{failed} hot quer{'y' if failed == 1 else 'ies'} would scan a full table.")
@@ -0,0 +1,75 @@
+# app/conditional.py
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import request, session, make_response
+from flask_login import current_user
+from app import db
+from app.models import Product, StatCounter, Rating, Favorite
+
+# ===================== CONDITIONAL GET =====================
+# Each page gets a cheap validator (an index lookup or two) computed before
+# the view runs. When it matches the client's If-None-Match the view is
+# skipped entirely and a bodiless 304 is returned.
+
+
+def catalog_version():
+    """Validator for listings: newest product change plus the product count."""
+    last_modified = db.session.query(db.func.max(Product.updated_at)).scalar()
+    count = db.session.query(StatCounter.value).filter_by(name="products").scalar()
+    return f"{last_modified}|{count}", last_modified
+
+
+def product_version(product_id):
+    """Validator for a product page; comments and ratings bump updated_at."""
+    last_modified = db.session.query(Product.updated_at).filter_by(id=product_id).scalar()
+    if last_modified is None:
+        return None
+    version = str(last_modified)
+    if current_user.is_authenticated:
+        # The page also shows this user's own rating and favorite state
+        stars = db.session.query(Rating.stars).filter_by(user_id=current_user.id, product_id=product_id).scalar()
+        fav = db.session.query(Favorite.id).filter_by(user_id=current_user.id, product_id=product_id).first()
+        version += f"|{stars}|{bool(fav)}"
+    return version, last_modified
+
+
+def conditional_page(validator):
+    """Answer GETs with 304 when the validator says the page is unchanged.
+
+    `validator` is called with the view's keyword arguments and returns a
+    (version, last_modified) pair, or None to skip conditional handling.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or session.get("_flashes"):
+                return view(*args, **kwargs)
+            validated = validator(**kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+
+            version, last_modified = validated
+            anonymous = not current_user.is_authenticated
+            viewer = "anon" if anonymous else f"{current_user.id}|{current_user.first_name}"
+            etag = hashlib.sha1(f"{version}|{viewer}|{request.full_path}".encode()).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+            not_modified = etag in request.if_none_match
+            if not request.if_none_match and anonymous and last_modified and request.if_modified_since:
+                not_modified = last_modified <= request.if_modified_since
+
+            response = make_response("", 304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if anonymous and last_modified:
+                    response.last_modified = last_modified
+                response.cache_control.no_cache = True
+                if anonymous:
+                    response.cache_control.public = True
+                else:
+                    response.cache_control.private = True
+            return response
+        return wrapper
+    return decorator
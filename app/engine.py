@@ -0,0 +1,55 @@
+# app/engine.py
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# ===================== DATABASE ENGINE =====================
+# Server databases get a sized connection pool that pings connections
+# before use and recycles them before the server's idle timeout. File
+# SQLite databases run in WAL mode, so readers no longer block behind a
+# writer and a commit appends to the log instead of rewriting pages, with
+# synchronous=NORMAL (durable across app crashes, only the last commits
+# can be lost on power failure), a busy timeout so concurrent writers
+# wait instead of failing, and memory-mapped reads. DB_ENGINE_TUNING=False
+# restores the driver defaults.
+
+
+def _is_file_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database URI."""
+    if not config["DB_ENGINE_TUNING"]:
+        return {}
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        if not _is_file_sqlite(url):
+            return {}  # in-memory databases use a single shared connection
+        return {"pool_size": config["DB_POOL_SIZE"], "max_overflow": config["DB_MAX_OVERFLOW"]}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def configure_engine(engine, config):
+    """Apply per-connection SQLite pragmas; call before the first connection."""
+    if not config["DB_ENGINE_TUNING"] or not _is_file_sqlite(engine.url):
+        return
+
+    pragmas = [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,48 @@
+# app/identity.py
+from flask import current_app
+from flask_login import UserMixin
+from app import db
+from app.cache import cache
+from app.models import User
+
+# ===================== IDENTITY CACHE =====================
+# Flask-Login asks for the user on every authenticated request. Instead of
+# a query each time, a snapshot of the columns views and templates read is
+# kept in the cache backend for USER_CACHE_TTL seconds. Routes that change
+# those columns call forget_user() after committing; routes that write to
+# the user load the real row with db.session.get().
+
+SNAPSHOT_FIELDS = ("id", "email", "first_name", "last_name", "phone", "photo",
+                   "country", "province", "city", "address", "zip_code", "is_admin")
+
+
+class CachedUser(UserMixin):
+    """Read-only, session-independent copy of a User's profile columns."""
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+
+def _key(user_id):
+    return f"user:{user_id}"
+
+
+def load_cached_user(user_id):
+    ttl = current_app.config["USER_CACHE_TTL"]
+    if ttl <= 0 or cache.backend is None:
+        return db.session.get(User, user_id)
+
+    data = cache.backend.get(_key(user_id))
+    if data is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        data = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+        cache.backend.set(_key(user_id), data, ttl)
+    return CachedUser(data)
+
+
+def forget_user(user_id):
+    """Drop a user's cached snapshot; call after committing profile changes."""
+    if cache.backend is not None:
+        cache.backend.delete(_key(user_id))
@@ -0,0 +1,111 @@
+# app/images.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for
+from PIL import Image, ImageOps
+
+# ===================== IMAGE VARIANTS =====================
+# Uploaded originals are kept as-is; resized WebP copies are written to
+# uploads/variants/ by a background pool. Templates ask for a size via
+# image_url() and get the original back until the variant exists.
+#
+# Which variants exist is kept in an in-process set, so rendering a page
+# never touches the filesystem per image. It is filled from one scan of
+# variants/, updated as this process generates or removes variants, and
+# rescanned at most every VARIANT_RESCAN_SECONDS when a lookup misses (to
+# pick up variants written by other workers or the CLI).
+
+VARIANT_DIR = "variants"
+VARIANT_WIDTHS = (200, 400, 800)
+VARIANT_FORMATS = ("webp",)
+# Also deleted with an upload: AVIF variants written by earlier versions
+CLEANUP_FORMATS = VARIANT_FORMATS + ("avif",)
+QUALITY = {"webp": 80}
+VARIANT_RESCAN_SECONDS = 60
+
+_executor = None
+_known_variants = set()
+_scanned_at = None
+
+
+def variant_name(filename, width, fmt):
+    return f"{VARIANT_DIR}/{filename}-{width}.{fmt}"
+
+
+def generate_variants(upload_folder, filename):
+    """Write every size/format variant for one uploaded image."""
+    src = os.path.join(upload_folder, filename)
+    os.makedirs(os.path.join(upload_folder, VARIANT_DIR), exist_ok=True)
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        for width in VARIANT_WIDTHS:
+            if img.width > width:
+                resized = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            else:
+                resized = img
+            for fmt in VARIANT_FORMATS:
+                dest = os.path.join(upload_folder, variant_name(filename, width, fmt))
+                tmp = f"{dest}.tmp"
+                resized.save(tmp, fmt.upper(), quality=QUALITY[fmt])
+                os.replace(tmp, dest)  # never expose a half-written file
+                _known_variants.add(variant_name(filename, width, fmt))
+
+
+def remove_variants(upload_folder, filename):
+    for width in VARIANT_WIDTHS:
+        for fmt in CLEANUP_FORMATS:
+            _known_variants.discard(variant_name(filename, width, fmt))
+            path = os.path.join(upload_folder, variant_name(filename, width, fmt))
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _generate_safely(app, upload_folder, filename):
+    try:
+        generate_variants(upload_folder, filename)
+    except Exception as e:
+        app.logger.warning("Could not generate variants for %s: %s", filename, e)
+
+
+def schedule_variants(filename):
+    """Generate variants for an uploaded file off the request thread."""
+    global _executor
+    if not filename:
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+    app = current_app._get_current_object()
+    _executor.submit(_generate_safely, app, app.config["UPLOAD_FOLDER"], filename)
+
+
+def _scan_variants(upload_folder):
+    global _known_variants, _scanned_at
+    try:
+        names = os.listdir(os.path.join(upload_folder, VARIANT_DIR))
+    except FileNotFoundError:
+        names = []
+    _known_variants = {f"{VARIANT_DIR}/{name}" for name in names if not name.endswith(".tmp")}
+    _scanned_at = time.monotonic()
+
+
+def has_variant(name):
+    """Whether the variant `name` exists, from the in-process set rather than a stat."""
+    if name in _known_variants:
+        return True
+    if _scanned_at is None or time.monotonic() - _scanned_at >= VARIANT_RESCAN_SECONDS:
+        _scan_variants(current_app.config["UPLOAD_FOLDER"])
+        return name in _known_variants
+    return False
+
+
+def image_url(filename, width=400, fmt="webp"):
+    """URL of the closest variant of an upload, falling back to the original."""
+    if not filename:
+        return url_for("static", filename="uploads/pro.jpg")
+    name = variant_name(filename, width, fmt)
+    if has_variant(name):
+        return url_for("static", filename="uploads/" + name)
+    return url_for("static", filename="uploads/" + filename)
@@ -0,0 +1,85 @@
+# app/inventory.py
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete
+from app import db
+from app.models import Product, StockReservation
+
+# ===================== INVENTORY =====================
+# Stock changes are conditional UPDATEs ("... WHERE stock - stock_reserved
+# >= :qty") rather than read-modify-write, so concurrent buyers can never
+# take the same unit: the database applies them one at a time and a
+# losing UPDATE simply matches no row. A whole cart is checked in a single
+# statement; if fewer rows match than there are lines, the caller rolls
+# back.
+
+
+def _per_product(mapping):
+    return case(mapping, value=Product.id, else_=0)
+
+
+def release_reservations(user_id=None, expired_only=False):
+    """Delete reservations and return their units to available stock.
+
+    DELETE ... RETURNING guarantees each reservation is released once even
+    if a checkout and the expiry sweep race for it.
+    """
+    stmt = delete(StockReservation)
+    if user_id is not None:
+        stmt = stmt.where(StockReservation.user_id == user_id)
+    if expired_only:
+        stmt = stmt.where(StockReservation.expires_at < datetime.utcnow())
+    rows = db.session.execute(stmt.returning(StockReservation.product_id, StockReservation.quantity)).all()
+
+    released = {}
+    for product_id, quantity in rows:
+        released[product_id] = released.get(product_id, 0) + quantity
+    if released:
+        db.session.query(Product).filter(Product.id.in_(released))\
+            .update({Product.stock_reserved: Product.stock_reserved - _per_product(released)},
+                    synchronize_session=False)
+    return released
+
+
+def _available_for(quantities):
+    return db.or_(Product.stock.is_(None), Product.stock - Product.stock_reserved >= _per_product(quantities))
+
+
+def reserve_cart(user_id, quantities):
+    """Hold stock for a confirmed cart ({product_id: qty}).
+
+    Returns the ids of every product whose reserved stock changed (so the
+    caller can invalidate their cached pages after committing), or None if
+    any line is short. Replaces the user's previous reservations. Stages
+    changes only; the caller commits on success and rolls back on failure.
+    """
+    touched = set(release_reservations(expired_only=True))
+    touched |= set(release_reservations(user_id=user_id))
+    if not quantities:
+        return touched
+
+    matched = db.session.query(Product)\
+        .filter(Product.id.in_(quantities), _available_for(quantities))\
+        .update({Product.stock_reserved: Product.stock_reserved + _per_product(quantities)},
+                synchronize_session=False)
+    if matched != len(quantities):
+        return None
+
+    expires_at = datetime.utcnow() + timedelta(minutes=current_app.config["STOCK_RESERVATION_MINUTES"])
+    db.session.add_all([
+        StockReservation(user_id=user_id, product_id=pid, quantity=qty, expires_at=expires_at)
+        for pid, qty in quantities.items()
+    ])
+    return touched | set(quantities)
+
+
+def commit_stock(user_id, quantities):
+    """Turn the user's reservation into a sale by decrementing stock. Returns False if any line is short."""
+    release_reservations(user_id=user_id)
+    if not quantities:
+        return True
+    matched = db.session.query(Product)\
+        .filter(Product.id.in_(quantities), _available_for(quantities))\
+        .update({Product.stock: Product.stock - _per_product(quantities)},
+                synchronize_session=False)
+    return matched == len(quantities)
@@ -0,0 +1,135 @@
+# app/mailqueue.py
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask_mail import Message
+from sqlalchemy import event
+from app import db, mail
+from app.models import OutboxEmail
+
+# ===================== OUTBOUND MAIL QUEUE =====================
+# Routes only write to the outbox table; a background worker drains it in
+# batches over a single SMTP connection, retrying with exponential backoff
+# until a message is sent or moved to the "dead" state.
+
+STALE_CLAIM = timedelta(minutes=10)
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def queue_email(subject, recipients, body, html=None):
+    """Stage an email in the outbox; it is sent once the caller commits."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    email = OutboxEmail(subject=subject, recipients=json.dumps(recipients), body=body, html=html)
+    db.session.add(email)
+    if _worker:
+        _worker.wake_after_commit()
+    return email
+
+
+def _claim_batch(batch_size):
+    """Mark up to batch_size due messages as ours and return them."""
+    now = datetime.utcnow()
+    due = db.or_(
+        db.and_(OutboxEmail.status == "pending", OutboxEmail.next_attempt_at <= now),
+        db.and_(OutboxEmail.status == "sending", OutboxEmail.claimed_at < now - STALE_CLAIM),
+    )
+    ids = [row.id for row in db.session.query(OutboxEmail.id).filter(due)
+           .order_by(OutboxEmail.next_attempt_at).limit(batch_size)]
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    db.session.query(OutboxEmail).filter(OutboxEmail.id.in_(ids), due)\
+        .update({"status": "sending", "claim_token": token, "claimed_at": now}, synchronize_session=False)
+    db.session.commit()
+    return OutboxEmail.query.filter_by(claim_token=token, status="sending").all()
+
+
+def _mark_failed(email, error, config):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    email.claim_token = None
+    if email.attempts >= config["MAIL_QUEUE_MAX_ATTEMPTS"]:
+        email.status = "dead"
+    else:
+        delay = config["MAIL_QUEUE_RETRY_BASE"] * (2 ** (email.attempts - 1))
+        email.status = "pending"
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=min(delay, 3600))
+
+
+def deliver_pending(app):
+    """Send one batch of due messages. Returns the number sent."""
+    with app.app_context():
+        batch = _claim_batch(app.config["MAIL_QUEUE_BATCH_SIZE"])
+        if not batch:
+            return 0
+
+        sent = 0
+        try:
+            with mail.connect() as conn:
+                for email in batch:
+                    try:
+                        conn.send(Message(subject=email.subject, recipients=email.recipient_list,
+                                          body=email.body, html=email.html))
+                    except Exception as e:
+                        _mark_failed(email, e, app.config)
+                    else:
+                        email.status = "sent"
+                        email.sent_at = datetime.utcnow()
+                        email.claim_token = None
+                        sent += 1
+        except Exception as e:
+            # Connection-level failure: every message not yet sent is retried
+            for email in batch:
+                if email.status == "sending":
+                    _mark_failed(email, e, app.config)
+        db.session.commit()
+        return sent
+
+
+class MailWorker(threading.Thread):
+    """Daemon thread that drains the outbox, sleeping between polls."""
+
+    def __init__(self, app):
+        super().__init__(name="mail-queue-worker", daemon=True)
+        self.app = app
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def wake_after_commit(self):
+        event.listen(db.session(), "after_commit", lambda session: self.wake(), once=True)
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        poll = self.app.config["MAIL_QUEUE_POLL_SECONDS"]
+        while not self._stopping.is_set():
+            try:
+                while deliver_pending(self.app):
+                    pass
+            except Exception as e:
+                self.app.logger.warning("Mail queue worker error: %s", e)
+            self._wake.wait(poll)
+            self._wake.clear()
+
+
+def start_worker(app):
+    """Start the in-process worker once per process."""
+    global _worker
+    worker = _worker
+    if worker is not None and worker.is_alive():
+        return worker  # the common case: no lock on the request path
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = MailWorker(app)
+            _worker.start()
+    return _worker
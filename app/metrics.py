@@ -0,0 +1,159 @@
+# app/metrics.py
+import bisect
+import hmac
+import threading
+import time
+from collections import defaultdict
+from flask import g, request, has_request_context, Response, abort
+from sqlalchemy import event
+
+# ===================== INSTRUMENTATION =====================
+# Every request records its latency, how many SQL statements it issued and
+# how long they took, labelled by endpoint, in an in-process registry that
+# /metrics exposes in the Prometheus text format. A statement slower than
+# SLOW_QUERY_MS is logged along with the route that issued it. A
+# statements-per-request histogram is where N+1 loops show up.
+#
+# The registry is per process: with several workers, scrape each one (or
+# sum them in Prometheus). /metrics is only served when METRICS_TOKEN is
+# set, since it exposes route timings and SQL text.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_query_seconds = 0
+        self.logger = None
+        self._lock = threading.Lock()
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.durations = {}               # endpoint -> Histogram (seconds)
+        self.statements = {}              # endpoint -> Histogram (statements per request)
+        self.db_seconds = defaultdict(float)
+        self.slow_queries = defaultdict(int)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.slow_query_seconds = app.config.get("SLOW_QUERY_MS", 0) / 1000
+        self.token = app.config.get("METRICS_TOKEN")
+        self.logger = app.logger
+        if not self.enabled:
+            return
+
+        from app import db
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if self.token:
+            app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+    # --- SQL hooks ---
+    # The start time lives on the execution context, which is dropped with the
+    # statement, so a statement that raises leaves nothing behind
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        in_request = has_request_context() and "metrics_start" in g
+        if in_request:
+            g.sql_count += 1
+            g.sql_seconds += elapsed
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            route = f"{request.method} {request.path} ({request.endpoint})" if in_request else "<background>"
+            self.logger.warning("Slow query %.1f ms in %s: %s", elapsed * 1000, route, " ".join(statement.split())[:1000])
+            with self._lock:
+                self.slow_queries[(request.endpoint or "<unmatched>") if in_request else "<background>"] += 1
+
+    # --- Request hooks ---
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+
+    def _finish_request(self, response):
+        if "metrics_start" not in g or request.endpoint == "metrics":
+            return response
+        elapsed = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or "<unmatched>"
+        with self._lock:
+            self.requests[(endpoint, request.method, response.status_code)] += 1
+            self.durations.setdefault(endpoint, Histogram(DURATION_BUCKETS)).observe(elapsed)
+            self.statements.setdefault(endpoint, Histogram(STATEMENT_BUCKETS)).observe(g.sql_count)
+            self.db_seconds[endpoint] += g.sql_seconds
+        return response
+
+    # --- Exposition ---
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP myshop_http_requests_total Requests handled, by endpoint, method and status.",
+                "# TYPE myshop_http_requests_total counter",
+            ]
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f'myshop_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {n}')
+            lines += [
+                "# HELP myshop_http_request_duration_seconds Time spent in the app per request.",
+                "# TYPE myshop_http_request_duration_seconds histogram",
+            ]
+            for endpoint, hist in sorted(self.durations.items()):
+                lines.extend(hist.lines("myshop_http_request_duration_seconds", f'endpoint="{endpoint}"'))
+            lines += [
+                "# HELP myshop_db_statements_per_request SQL statements issued per request.",
+                "# TYPE myshop_db_statements_per_request histogram",
+            ]
+            for endpoint, hist in sorted(self.statements.items()):
+                lines.extend(hist.lines("myshop_db_statements_per_request", f'endpoint="{endpoint}"'))
+            lines += [
+                "# HELP myshop_db_seconds_total Time spent executing SQL, by endpoint.",
+                "# TYPE myshop_db_seconds_total counter",
+            ]
+            for endpoint, seconds in sorted(self.db_seconds.items()):
+                lines.append(f'myshop_db_seconds_total{{endpoint="{endpoint}"}} {seconds:.6f}')
+            lines += [
+                "# HELP myshop_db_slow_queries_total Statements slower than SLOW_QUERY_MS.",
+                "# TYPE myshop_db_slow_queries_total counter",
+            ]
+            for endpoint, n in sorted(self.slow_queries.items()):
+                lines.append(f'myshop_db_slow_queries_total{{endpoint="{endpoint}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        sent = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(sent, self.token):
+            abort(403)
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
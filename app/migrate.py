@@ -0,0 +1,106 @@
+# app/migrate.py
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+import sqlalchemy as sa
+from app import db
+
+# ===================== SCHEMA MIGRATIONS =====================
+# Versioned scripts live in app/migrations/ as NNNN_description.py, each
+# with an upgrade(conn) function. Applied versions are recorded in
+# schema_migrations and every script runs in its own transaction.
+#
+# Scripts never import app.models or application code: each one spells out
+# the tables, columns and backfills it needs as they were when it was
+# written, so it does the same thing however the models change later.
+# They use the helpers below, which skip work that is already done, so a
+# new database and an old one brought forward step by step end up with
+# the same schema.
+
+MIGRATIONS_PACKAGE = "app.migrations"
+
+schema_migrations = sa.Table(
+    "schema_migrations", sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(255), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+def available_migrations():
+    """[(version, name, module)] for every script, in version order."""
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    found = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = re.match(r"^(\d{4})_\w+$", info.name)
+        if match:
+            module = importlib.import_module(f"{MIGRATIONS_PACKAGE}.{info.name}")
+            found.append((int(match.group(1)), info.name, module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def applied_versions(conn):
+    schema_migrations.create(conn, checkfirst=True)
+    return {row.version for row in conn.execute(sa.select(schema_migrations.c.version))}
+
+
+def pending_migrations():
+    with db.engine.begin() as conn:
+        applied = applied_versions(conn)
+    return [m for m in available_migrations() if m[0] not in applied]
+
+
+def upgrade_database(log=None):
+    """Apply every pending migration in order. Returns the names applied."""
+    done = []
+    for version, name, module in pending_migrations():
+        with db.engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()))
+        done.append(name)
+        if log:
+            log(name)
+    return done
+
+
+# --- Idempotent operations for migration scripts ---
+
+def has_table(conn, table):
+    return sa.inspect(conn).has_table(table)
+
+
+def has_column(conn, table, column):
+    return any(c["name"] == column for c in sa.inspect(conn).get_columns(table))
+
+
+def has_index(conn, table, name):
+    return any(ix["name"] == name for ix in sa.inspect(conn).get_indexes(table))
+
+
+def has_unique(conn, table, columns):
+    """True if a unique constraint or unique index covers exactly `columns`."""
+    inspector = sa.inspect(conn)
+    wanted = list(columns)
+    return (any(uc["column_names"] == wanted for uc in inspector.get_unique_constraints(table))
+            or any(ix["unique"] and ix["column_names"] == wanted for ix in inspector.get_indexes(table)))
+
+
+def add_column(conn, table, column):
+    """ALTER TABLE ... ADD COLUMN for a detached sa.Column, unless it exists."""
+    if has_column(conn, table, column.name):
+        return False
+    sa.Table(table, sa.MetaData(), column)
+    ddl = sa.schema.CreateColumn(column).compile(dialect=conn.dialect)
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(sa.text(f"ALTER TABLE {preparer.quote(table)} ADD COLUMN {ddl}"))
+    return True
+
+
+def create_index(conn, name, table, *columns, unique=False):
+    if has_index(conn, table, name):
+        return False
+    reflected = sa.Table(table, sa.MetaData(), autoload_with=conn)
+    sa.Index(name, *(reflected.c[c] for c in columns), unique=unique).create(conn)
+    return True
@@ -0,0 +1,189 @@
+"""The schema as it stood when versioned migrations were introduced.
+
+The tables are spelled out here rather than taken from app.models, so
+this script builds the same schema however the models change later. On
+a new database it creates every table and the later scripts add what
+came after; on a database from before migrations it only adds the
+tables that were missing, and 0002 brings the old ones forward.
+"""
+import sqlalchemy as sa
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "order_status_count", metadata,
+    sa.Column("status", sa.String(50), primary_key=True),
+    sa.Column("order_count", sa.Integer, nullable=False),
+)
+
+sa.Table(
+    "outbox_email", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("subject", sa.String(255), nullable=False),
+    sa.Column("recipients", sa.Text, nullable=False),
+    sa.Column("body", sa.Text),
+    sa.Column("html", sa.Text),
+    sa.Column("status", sa.String(20), nullable=False),
+    sa.Column("attempts", sa.Integer, nullable=False),
+    sa.Column("next_attempt_at", sa.DateTime, nullable=False),
+    sa.Column("claim_token", sa.String(32)),
+    sa.Column("claimed_at", sa.DateTime),
+    sa.Column("last_error", sa.Text),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("sent_at", sa.DateTime),
+    sa.Index("ix_outbox_email_status_next_attempt", "status", "next_attempt_at"),
+)
+
+sa.Table(
+    "product", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(255), nullable=False),
+    sa.Column("description", sa.Text),
+    sa.Column("specifications", sa.Text),
+    sa.Column("categories", sa.String(500)),
+    sa.Column("price", sa.Float),
+    sa.Column("discount_price", sa.Float),
+    sa.Column("main_image", sa.String(500)),
+    sa.Column("image2", sa.String(500)),
+    sa.Column("image3", sa.String(500)),
+    sa.Column("image4", sa.String(500)),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("updated_at", sa.DateTime, index=True),
+    sa.Column("stock", sa.Integer),
+    sa.Column("stock_reserved", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_count", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_sum", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_avg", sa.Float, nullable=False, server_default="0"),
+    sa.Column("rating_1", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_2", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_3", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_4", sa.Integer, nullable=False, server_default="0"),
+    sa.Column("rating_5", sa.Integer, nullable=False, server_default="0"),
+    sa.Index("ix_product_created_at_id", "created_at", "id"),
+    sa.Index("ix_product_rating_avg_id", "rating_avg", "id"),
+)
+
+sa.Table(
+    "product_sales", metadata,
+    sa.Column("product_id", sa.Integer, primary_key=True),
+    sa.Column("units_sold", sa.Integer, nullable=False),
+    sa.Column("revenue", sa.Float, nullable=False),
+)
+
+sa.Table(
+    "sales_daily", metadata,
+    sa.Column("day", sa.Date, primary_key=True),
+    sa.Column("revenue", sa.Float, nullable=False),
+    sa.Column("order_count", sa.Integer, nullable=False),
+)
+
+sa.Table(
+    "stat_counter", metadata,
+    sa.Column("name", sa.String(50), primary_key=True),
+    sa.Column("value", sa.Float, nullable=False),
+)
+
+sa.Table(
+    "stored_file", metadata,
+    sa.Column("name", sa.String(100), primary_key=True),
+    sa.Column("refcount", sa.Integer, nullable=False),
+    sa.Column("created_at", sa.DateTime),
+)
+
+sa.Table(
+    "user", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("email", sa.String(255), nullable=False, unique=True),
+    sa.Column("password_hash", sa.String(255), nullable=False),
+    sa.Column("first_name", sa.String(100)),
+    sa.Column("last_name", sa.String(100)),
+    sa.Column("phone", sa.String(50)),
+    sa.Column("country", sa.String(100)),
+    sa.Column("province", sa.String(100)),
+    sa.Column("city", sa.String(100)),
+    sa.Column("address", sa.Text),
+    sa.Column("zip_code", sa.String(20)),
+    sa.Column("photo", sa.String(255)),
+    sa.Column("is_admin", sa.Boolean, nullable=False, server_default="0"),
+    sa.Column("created_at", sa.DateTime),
+)
+
+sa.Table(
+    "cart", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("quantity", sa.Integer),
+    sa.Column("added_at", sa.DateTime),
+    sa.UniqueConstraint("user_id", "product_id", name="uq_cart_user_id_product_id"),
+)
+
+sa.Table(
+    "comment", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id")),
+    sa.Column("name", sa.String(120)),
+    sa.Column("content", sa.Text, nullable=False),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_comment_product_id_created_at", "product_id", "created_at"),
+)
+
+sa.Table(
+    "favorite", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("created_at", sa.DateTime),
+    sa.UniqueConstraint("user_id", "product_id"),
+)
+
+sa.Table(
+    "order", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("order_number", sa.String(100), unique=True, index=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("total_amount", sa.Float),
+    sa.Column("shipping", sa.Float),
+    sa.Column("status", sa.String(50)),
+    sa.Column("payment_method", sa.String(20)),
+    sa.Column("created_at", sa.DateTime, index=True),
+    sa.Index("ix_order_user_id_created_at", "user_id", "created_at"),
+)
+
+sa.Table(
+    "rating", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("stars", sa.Integer, nullable=False),
+    sa.Column("created_at", sa.DateTime),
+    sa.UniqueConstraint("user_id", "product_id"),
+    sa.Index("ix_rating_product_id_stars", "product_id", "stars"),
+)
+
+sa.Table(
+    "stock_reservation", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("quantity", sa.Integer, nullable=False),
+    sa.Column("expires_at", sa.DateTime, nullable=False, index=True),
+    sa.UniqueConstraint("user_id", "product_id"),
+)
+
+sa.Table(
+    "order_item", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("order_id", sa.Integer, sa.ForeignKey("order.id"), nullable=False, index=True),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_name", sa.String(255)),
+    sa.Column("unit_price", sa.Float),
+    sa.Column("quantity", sa.Integer),
+    sa.Column("discount_price", sa.Float),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,48 @@
+"""Columns added to existing tables since the original schema.
+
+- product: updated_at, stock, stock_reserved and the rating aggregates
+  (backfilled from the rating table).
+- user: is_admin, granted to the LEGACY_ADMIN_EMAIL account if configured.
+- cart: one row per (user_id, product_id); duplicates are merged first.
+- order.created_at and the product listing indexes.
+"""
+import sqlalchemy as sa
+from flask import current_app
+from app.migrate import add_column, create_index, has_unique
+
+
+def upgrade(conn):
+    if add_column(conn, "product", sa.Column("updated_at", sa.DateTime)):
+        conn.execute(sa.text("UPDATE product SET updated_at = created_at"))
+    add_column(conn, "product", sa.Column("stock", sa.Integer))
+    add_column(conn, "product", sa.Column("stock_reserved", sa.Integer, nullable=False, server_default="0"))
+    for name in ("rating_count", "rating_sum", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5"):
+        add_column(conn, "product", sa.Column(name, sa.Integer, nullable=False, server_default="0"))
+    if add_column(conn, "product", sa.Column("rating_avg", sa.Float, nullable=False, server_default="0")):
+        per_product = "FROM rating WHERE rating.product_id = product.id"
+        buckets = ", ".join(f"rating_{s} = (SELECT COUNT(*) {per_product} AND rating.stars = {s})" for s in range(1, 6))
+        conn.execute(sa.text(
+            f"UPDATE product SET rating_count = (SELECT COUNT(*) {per_product}), "
+            f"rating_sum = (SELECT COALESCE(SUM(stars), 0) {per_product}), "
+            f"rating_avg = COALESCE((SELECT AVG(stars) {per_product}), 0), {buckets}"))
+    create_index(conn, "ix_product_updated_at", "product", "updated_at")
+    create_index(conn, "ix_product_created_at_id", "product", "created_at", "id")
+    create_index(conn, "ix_product_rating_avg_id", "product", "rating_avg", "id")
+
+    legacy_admin = current_app.config.get("LEGACY_ADMIN_EMAIL")
+    if add_column(conn, "user", sa.Column("is_admin", sa.Boolean, nullable=False, server_default="0")) and legacy_admin:
+        conn.execute(sa.text('UPDATE "user" SET is_admin = :yes WHERE email = :email'),
+                     {"yes": True, "email": legacy_admin.strip().lower()})
+
+    create_index(conn, "ix_order_created_at", "order", "created_at")
+
+    if not has_unique(conn, "cart", ["user_id", "product_id"]):
+        duplicates = conn.execute(sa.text(
+            "SELECT user_id, product_id, MIN(id) AS keep, SUM(quantity) AS total FROM cart "
+            "GROUP BY user_id, product_id HAVING COUNT(*) > 1")).all()
+        for row in duplicates:
+            conn.execute(sa.text("UPDATE cart SET quantity = :total WHERE id = :keep"),
+                         {"total": row.total, "keep": row.keep})
+            conn.execute(sa.text("DELETE FROM cart WHERE user_id = :u AND product_id = :p AND id <> :keep"),
+                         {"u": row.user_id, "p": row.product_id, "keep": row.keep})
+        create_index(conn, "uq_cart_user_id_product_id", "cart", "user_id", "product_id", unique=True)
@@ -0,0 +1,20 @@
+"""Composite indexes for the foreign keys every page filters on.
+
+Each one matches a query in the routes (checked by `flask check-query-plans`):
+
+- comment (product_id, created_at): product page, newest comments first
+- rating (product_id, stars): histogram rebuild and product deletes;
+  per-user lookups use the existing unique (user_id, product_id)
+- order (user_id, created_at): "my orders", newest first
+- order_item (order_id): items for a page of orders
+- cart and favorite per-user lookups are served by their unique
+  (user_id, product_id) constraints
+"""
+from app.migrate import create_index
+
+
+def upgrade(conn):
+    create_index(conn, "ix_comment_product_id_created_at", "comment", "product_id", "created_at")
+    create_index(conn, "ix_rating_product_id_stars", "rating", "product_id", "stars")
+    create_index(conn, "ix_order_user_id_created_at", "order", "user_id", "created_at")
+    create_index(conn, "ix_order_item_order_id", "order_item", "order_id")
@@ -0,0 +1,9 @@
+"""product.comment_count, backfilled from the comment table."""
+import sqlalchemy as sa
+from app.migrate import add_column
+
+
+def upgrade(conn):
+    if add_column(conn, "product", sa.Column("comment_count", sa.Integer, nullable=False, server_default="0")):
+        conn.execute(sa.text(
+            "UPDATE product SET comment_count = (SELECT COUNT(*) FROM comment WHERE comment.product_id = product.id)"))
@@ -0,0 +1,104 @@
+"""Normalized category and specification tables, backfilled from the text columns.
+
+category / product_category / product_spec mirror Product.categories and
+Product.specifications (see app/catalog.py). product_category carries a
+copy of product.created_at so ix_product_category_listing serves a
+category page, newest first, as a single range scan.
+
+The tables and the text parsing are copied here as they were when this
+script was written, so it backfills the same rows whatever app/catalog.py
+does later.
+"""
+import re
+import sqlalchemy as sa
+
+CHUNK = 5000
+
+metadata = sa.MetaData()
+
+product = sa.Table(
+    "product", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("categories", sa.String(500)),
+    sa.Column("specifications", sa.Text),
+)
+
+category = sa.Table(
+    "category", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("slug", sa.String(120), nullable=False, unique=True),
+    sa.Column("product_count", sa.Integer, nullable=False, server_default="0"),
+)
+
+product_category = sa.Table(
+    "product_category", metadata,
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), primary_key=True),
+    sa.Column("category_id", sa.Integer, sa.ForeignKey("category.id"), primary_key=True),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Index("ix_product_category_listing", "category_id", "created_at", "product_id"),
+)
+
+product_spec = sa.Table(
+    "product_spec", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("product_id", sa.Integer, sa.ForeignKey("product.id"), nullable=False),
+    sa.Column("position", sa.Integer, nullable=False),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("value", sa.String(255), nullable=False),
+    sa.Index("ix_product_spec_product_id_name_value", "product_id", "name", "value"),
+)
+
+
+def _categories(text):
+    """{slug: name} for a comma-separated category string, first spelling wins."""
+    categories = {}
+    for name in (text or "").split(","):
+        name = name.strip()[:100]
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:120]
+        if slug and slug not in categories:
+            categories[slug] = name
+    return categories
+
+
+def _specifications(text):
+    """[(name, value)] from "Name: Value" lines."""
+    specs = []
+    for line in (text or "").splitlines():
+        name, _, value = line.partition(":")
+        if name.strip():
+            specs.append((name.strip()[:100], value.strip()[:255]))
+    return specs
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[category, product_category, product_spec], checkfirst=True)
+    if conn.execute(sa.select(product_category.c.product_id).limit(1)).first():
+        return
+
+    conn.execute(product_spec.delete())
+    products = conn.execute(sa.select(product.c.id, product.c.created_at,
+                                      product.c.categories, product.c.specifications)).all()
+    names = {}
+    for row in products:
+        for slug, name in _categories(row.categories).items():
+            names.setdefault(slug, name)
+    existing = set(conn.scalars(sa.select(category.c.slug)))
+    missing = [dict(slug=slug, name=name) for slug, name in names.items() if slug not in existing]
+    if missing:
+        conn.execute(category.insert(), missing)
+    ids = dict(conn.execute(sa.select(category.c.slug, category.c.id)).all())
+
+    links, specs = [], []
+    for row in products:
+        links += [dict(product_id=row.id, category_id=ids[slug], created_at=row.created_at)
+                  for slug in _categories(row.categories)]
+        specs += [dict(product_id=row.id, position=i, name=name, value=value)
+                  for i, (name, value) in enumerate(_specifications(row.specifications))]
+    for table, rows in ((product_category, links), (product_spec, specs)):
+        for i in range(0, len(rows), CHUNK):
+            conn.execute(table.insert(), rows[i:i + CHUNK])
+
+    counts = sa.select(sa.func.count()).where(product_category.c.category_id == category.c.id).scalar_subquery()
+    conn.execute(category.update().values(product_count=counts))
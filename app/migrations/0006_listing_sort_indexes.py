@@ -0,0 +1,18 @@
+"""product.sales_count plus the indexes behind the listing sorts and filters.
+
+- product (price, id): price sorts and min/max price filters
+- product (sales_count, id): "popular" sort; sales_count is backfilled
+  from the product_sales rollup
+- the newest and top-rated sorts reuse (created_at, id) and (rating_avg, id)
+"""
+import sqlalchemy as sa
+from app.migrate import add_column, create_index
+
+
+def upgrade(conn):
+    if add_column(conn, "product", sa.Column("sales_count", sa.Integer, nullable=False, server_default="0")):
+        conn.execute(sa.text(
+            "UPDATE product SET sales_count = COALESCE("
+            "(SELECT units_sold FROM product_sales WHERE product_sales.product_id = product.id), 0)"))
+    create_index(conn, "ix_product_price_id", "product", "price", "id")
+    create_index(conn, "ix_product_sales_count_id", "product", "sales_count", "id")
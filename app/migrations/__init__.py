@@ -0,0 +1 @@
+# Versioned schema migrations; see app/migrate.py.
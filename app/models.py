@@ -18,6 +18,7 @@ class User(db.Model, UserMixin):
     address = db.Column(db.Text)
     zip_code = db.Column(db.String(20))
     photo = db.Column(db.String(255), nullable=True)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -40,7 +41,9 @@ class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
-    specifications = db.Column(db.Text)  # Could be JSON string
+    # Text as entered in the admin forms (and indexed for search); listings and
+    # the product page read the normalized Category/ProductSpec rows instead
+    specifications = db.Column(db.Text)  # "Name: Value" lines
     categories = db.Column(db.String(500))  # comma-separated
     price = db.Column(db.Float, default=0.0)
     discount_price = db.Column(db.Float, default=0.0)
@@ -49,6 +52,29 @@ class Product(db.Model):
     image3 = db.Column(db.String(500))
     image4 = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on edits and on new comments/ratings; drives page ETags
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Inventory: stock is units on hand (NULL = not tracked), stock_reserved is
+    # the part held by confirmed-but-unpaid carts. See app/inventory.py.
+    stock = db.Column(db.Integer, nullable=True)
+    stock_reserved = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
+    # Rating aggregates, maintained by app.rollups.record_rating
+    rating_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_avg = db.Column(db.Float, default=0.0, server_default="0", nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
+    # Maintained by app.rollups.record_comment so product pages never COUNT(*) comments
+    comment_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
+    # Units sold, maintained by app.rollups.record_order for the "popular" sort
+    sales_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
 
     # Relationships
     cart_items = db.relationship("Cart", backref="product", lazy=True)
@@ -56,6 +82,55 @@ class Product(db.Model):
     comments = db.relationship("Comment", backref="product", lazy=True)
     ratings = db.relationship("Rating", backref="product", lazy=True)
     favorites = db.relationship("Favorite", backref="product", lazy=True)
+    category_list = db.relationship("Category", secondary="product_category", viewonly=True,
+                                    order_by="Category.name", lazy=True)
+    specs = db.relationship("ProductSpec", order_by="ProductSpec.position", viewonly=True, lazy=True)
+
+    __table_args__ = (
+        db.Index("ix_product_created_at_id", "created_at", "id"),
+        db.Index("ix_product_rating_avg_id", "rating_avg", "id"),
+        # Listing sorts; each keyset page is a range scan on one of these
+        db.Index("ix_product_price_id", "price", "id"),
+        db.Index("ix_product_sales_count_id", "sales_count", "id"),
+    )
+
+    @property
+    def stock_available(self):
+        return None if self.stock is None else max(0, self.stock - self.stock_reserved)
+
+    @property
+    def rating_histogram(self):
+        """Counts of 1..5 star ratings, in that order."""
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
+
+# ===================== CATALOG MODELS =====================
+# Normalized categories and specifications, kept in step with the text
+# columns by app/catalog.py.
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(120), unique=True, nullable=False)
+    product_count = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+
+
+class ProductCategory(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), primary_key=True)
+    # Copy of product.created_at so a category page is one index range scan
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.Index("ix_product_category_listing", "category_id", "created_at", "product_id"),)
+
+
+class ProductSpec(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    position = db.Column(db.Integer, default=0, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    value = db.Column(db.String(255), nullable=False)
+
+    __table_args__ = (db.Index("ix_product_spec_product_id_name_value", "product_id", "name", "value"),)
 
 
 # ===================== CART MODEL =====================
@@ -66,6 +141,20 @@ class Cart(db.Model):
     quantity = db.Column(db.Integer, default=1)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Also serves every "cart for this user" lookup
+    __table_args__ = (db.UniqueConstraint("user_id", "product_id", name="uq_cart_user_id_product_id"),)
+
+
+# ===================== STOCK RESERVATION MODEL =====================
+class StockReservation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (db.UniqueConstraint("user_id", "product_id"),)
+
 
 # ===================== ORDER MODEL =====================
 class Order(db.Model):
@@ -76,15 +165,17 @@ class Order(db.Model):
     shipping = db.Column(db.Float, default=0.0)
     status = db.Column(db.String(50), default="Pending")
     payment_method = db.Column(db.String(20), default="cod")  # cod or card
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     items = db.relationship("OrderItem", backref="order", lazy=True)
 
+    __table_args__ = (db.Index("ix_order_user_id_created_at", "user_id", "created_at"),)
+
 
 # ===================== ORDER ITEM MODEL =====================
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     product_name = db.Column(db.String(255))
@@ -102,6 +193,8 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_comment_product_id_created_at", "product_id", "created_at"),)
+
 
 # ===================== RATING MODEL =====================
 class Rating(db.Model):
@@ -111,7 +204,10 @@ class Rating(db.Model):
     stars = db.Column(db.Integer, nullable=False)  # 1–5
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint("user_id", "product_id"),)
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "product_id"),
+        db.Index("ix_rating_product_id_stars", "product_id", "stars"),
+    )
 
 
 # ===================== FAVORITE MODEL =====================
@@ -122,3 +218,60 @@ class Favorite(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (db.UniqueConstraint("user_id", "product_id"),)
+
+
+# ===================== SALES ROLLUP MODELS =====================
+# Maintained incrementally by app/rollups.py so the admin dashboard never
+# aggregates over the order tables.
+class StatCounter(db.Model):
+    name = db.Column(db.String(50), primary_key=True)  # products, orders, revenue, units_sold
+    value = db.Column(db.Float, default=0.0, nullable=False)
+
+
+class SalesDaily(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+    order_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class ProductSales(db.Model):
+    product_id = db.Column(db.Integer, primary_key=True)  # no FK: survives product deletion
+    units_sold = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+
+
+class OrderStatusCount(db.Model):
+    status = db.Column(db.String(50), primary_key=True)
+    order_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+# ===================== OUTBOX EMAIL MODEL =====================
+class OutboxEmail(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # JSON list
+    body = db.Column(db.Text)
+    html = db.Column(db.Text)
+    status = db.Column(db.String(20), default="pending", nullable=False)  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index("ix_outbox_email_status_next_attempt", "status", "next_attempt_at"),)
+
+    @property
+    def recipient_list(self):
+        return json.loads(self.recipients)
+
+
+# ===================== STORED FILE MODEL =====================
+# One row per content-addressed upload; refcount tracks how many product
+# images / profile photos point at it so the file can be removed safely.
+class StoredFile(db.Model):
+    name = db.Column(db.String(100), primary_key=True)  # <sha256 prefix>.<ext>
+    refcount = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
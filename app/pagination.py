@@ -0,0 +1,54 @@
+# app/pagination.py
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+# ===================== KEYSET PAGINATION =====================
+# Pages are addressed by an opaque cursor holding the sort key and id of the
+# last row shown - (created_at, id) unless the listing sorts by something
+# else - so each page is an index range scan instead of an OFFSET.
+
+PER_PAGE = 24
+
+
+def encode_cursor(value, row_id):
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    raw = f"{value}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """(value, id) from a cursor, with `parse` turning the value back into the sort key's type."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return parse(value), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(query, model, cursor=None, per_page=PER_PAGE, columns=None, ascending=False):
+    """Return (items, next_cursor) for rows newest-first by (created_at, id).
+
+    `columns` orders by another (value, id) pair instead: a numeric sort
+    key on the model such as (price, id), or copies of created_at and id on
+    a link table so its index drives the scan. The value column's name must
+    also be an attribute of the returned rows. `ascending` flips the order.
+    """
+    value_column, row_id = columns or (model.created_at, model.id)
+    python_type = value_column.type.python_type
+    position = decode_cursor(cursor, datetime.fromisoformat if python_type is datetime else python_type)
+    if position:
+        key = tuple_(value_column, row_id)
+        query = query.filter(key > position if ascending else key < position)
+    order = (value_column.asc(), row_id.asc()) if ascending else (value_column.desc(), row_id.desc())
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, value_column.key), last.id)
+    return items, next_cursor
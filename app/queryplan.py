@@ -0,0 +1,123 @@
+# app/queryplan.py
+import json
+import re
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from app import db
+from app.models import (Product, Cart, Comment, Rating, Favorite, Order, OrderItem,
+                        StockReservation, OutboxEmail, Category, ProductCategory, ProductSpec)
+
+# ===================== QUERY PLAN CHECK =====================
+# The queries behind the busiest pages, in the shape the routes issue them.
+# check_query_plans() asks the database how it would run each one and
+# reports any that would read a whole table instead of using an index.
+
+
+def hot_queries():
+    now = datetime.utcnow()
+    _category = db.aliased(ProductCategory)
+    return {
+        "cart lines (cart, confirm, checkout)": select(Cart).where(Cart.user_id == 1),
+        "cart summary (batch API)": select(Cart.product_id, Cart.quantity, Product.name, Product.price)
+            .join(Product, Product.id == Cart.product_id).where(Cart.user_id == 1).order_by(Cart.added_at),
+        "product comments": select(Comment).where(Comment.product_id == 1)
+            .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(11),
+        "product comments, next page": select(Comment)
+            .where(Comment.product_id == 1, tuple_(Comment.created_at, Comment.id) < tuple_(now, 1))
+            .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(11),
+        "user's rating": select(Rating.stars).where(Rating.user_id == 1, Rating.product_id == 1),
+        "product rating histogram": select(Rating.stars, db.func.count()).where(Rating.product_id == 1)
+            .group_by(Rating.stars),
+        "user's favorite flag": select(Favorite.id).where(Favorite.user_id == 1, Favorite.product_id == 1),
+        "favorites page": select(Favorite).where(Favorite.user_id == 1),
+        "my orders": select(Order).where(Order.user_id == 1).order_by(Order.created_at.desc()),
+        "order items (selectinload)": select(OrderItem).where(OrderItem.order_id.in_([1, 2, 3])),
+        "admin orders": select(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(51),
+        "catalog first page": select(Product).order_by(Product.created_at.desc(), Product.id.desc()).limit(24),
+        "catalog next page": select(Product)
+            .where(tuple_(Product.created_at, Product.id) < tuple_(now, 1))
+            .order_by(Product.created_at.desc(), Product.id.desc()).limit(24),
+        "listing by price, in range": select(Product)
+            .where(Product.price >= 10, Product.price <= 50, tuple_(Product.price, Product.id) > tuple_(10.0, 1))
+            .order_by(Product.price.asc(), Product.id.asc()).limit(25),
+        "listing by price, descending": select(Product)
+            .order_by(Product.price.desc(), Product.id.desc()).limit(25),
+        "listing best selling, on sale": select(Product).where(Product.discount_price > 0)
+            .order_by(Product.sales_count.desc(), Product.id.desc()).limit(25),
+        "listing top rated, next page": select(Product)
+            .where(Product.rating_avg >= 4, tuple_(Product.rating_avg, Product.id) < tuple_(5.0, 1))
+            .order_by(Product.rating_avg.desc(), Product.id.desc()).limit(25),
+        "listing newest, price range": select(Product).where(Product.price >= 10, Product.price <= 50)
+            .order_by(Product.created_at.desc(), Product.id.desc()).limit(25),
+        "category by slug": select(Category).where(Category.slug == "shoes"),
+        "category page": select(Product).join(ProductCategory, ProductCategory.product_id == Product.id)
+            .where(ProductCategory.category_id == 1)
+            .order_by(ProductCategory.created_at.desc(), ProductCategory.product_id.desc()).limit(25),
+        "category page, spec filter": select(Product).join(ProductCategory, ProductCategory.product_id == Product.id)
+            .where(ProductCategory.category_id == 1,
+                   tuple_(ProductCategory.created_at, ProductCategory.product_id) < tuple_(now, 1),
+                   select(ProductSpec.id).where(ProductSpec.product_id == ProductCategory.product_id,
+                                                ProductSpec.name == "Size", ProductSpec.value == "M").exists())
+            .order_by(ProductCategory.created_at.desc(), ProductCategory.product_id.desc()).limit(25),
+        "category facets, related categories": select(Category.slug, Category.name, db.func.count())
+            .select_from(ProductCategory).join(Category, Category.id == ProductCategory.category_id)
+            .where(ProductCategory.product_id.in_(select(_category.product_id).where(_category.category_id == 1)),
+                   ProductCategory.category_id != 1)
+            .group_by(Category.id, Category.slug, Category.name),
+        "category facets, spec values": select(ProductSpec.name, ProductSpec.value, db.func.count())
+            .where(ProductSpec.product_id.in_(select(_category.product_id).where(_category.category_id == 1)))
+            .group_by(ProductSpec.name, ProductSpec.value),
+        "product categories (selectinload)": select(Category)
+            .join(ProductCategory, ProductCategory.category_id == Category.id)
+            .where(ProductCategory.product_id.in_([1])),
+        "product specs (selectinload)": select(ProductSpec).where(ProductSpec.product_id.in_([1]))
+            .order_by(ProductSpec.position),
+        "catalog version": select(db.func.max(Product.updated_at)),
+        "expired reservations": select(StockReservation.id).where(StockReservation.expires_at < now),
+        "due outbox emails": select(OutboxEmail.id)
+            .where(OutboxEmail.status == "pending", OutboxEmail.next_attempt_at <= now)
+            .order_by(OutboxEmail.next_attempt_at).limit(50),
+    }
+
+
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)\S+( AS \S+)?$")
+
+
+def _sqlite_plan(conn, compiled):
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+    details = [row[-1] for row in rows]
+    return details, [d for d in details if _SQLITE_FULL_SCAN.match(d)]
+
+
+def _postgres_plan(conn, compiled):
+    # With sequential scans priced out, any that remain have no usable index
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    details, scans = [], []
+
+    def walk(node, depth=0):
+        line = "  " * depth + node["Node Type"] + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+        details.append(line)
+        if node["Node Type"] == "Seq Scan":
+            scans.append(line.strip())
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"])
+    return details, scans
+
+
+def check_query_plans():
+    """Return {name: (plan lines, full scans)} for every hot query."""
+    results = {}
+    with db.engine.connect() as conn:
+        explain = {"sqlite": _sqlite_plan, "postgresql": _postgres_plan}.get(conn.dialect.name)
+        if explain is None:
+            raise RuntimeError(f"Query plan checks are not implemented for {conn.dialect.name}.")
+        for name, stmt in hot_queries().items():
+            with conn.begin():
+                compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+                results[name] = explain(conn, compiled)
+    return results
@@ -0,0 +1,177 @@
+# app/rollups.py
+from datetime import datetime
+from app import db
+from app.models import Product, Order, OrderItem, Rating, Comment, StatCounter, SalesDaily, ProductSales, OrderStatusCount
+from app.upsert import upsert_add, upsert_add_many
+
+# ===================== SALES ROLLUPS =====================
+# Every helper here only stages changes on the current session; callers
+# commit them together with the order/product change that caused them.
+
+
+def record_product_added(count=1):
+    upsert_add(StatCounter, {"name": "products"}, value=count)
+
+
+def record_product_removed(count=1):
+    upsert_add(StatCounter, {"name": "products"}, value=-count)
+
+
+def record_order(order, items):
+    """Stage rollup updates for a newly placed order.
+
+    `items` are the order's OrderItem rows as dicts (as bulk-inserted).
+    """
+    day = (order.created_at or datetime.utcnow()).date()
+    units = sum(oi["quantity"] for oi in items)
+
+    upsert_add_many(StatCounter, ["name"], [
+        {"name": "orders", "value": 1},
+        {"name": "revenue", "value": order.total_amount or 0},
+        {"name": "units_sold", "value": units},
+    ])
+    upsert_add(SalesDaily, {"day": day}, revenue=order.total_amount or 0, order_count=1)
+    upsert_add(OrderStatusCount, {"status": order.status}, order_count=1)
+
+    per_product = {}
+    for oi in items:
+        row = per_product.setdefault(oi["product_id"], {"product_id": oi["product_id"], "units_sold": 0, "revenue": 0.0})
+        row["units_sold"] += oi["quantity"]
+        row["revenue"] += (oi["unit_price"] or 0) * oi["quantity"]
+    upsert_add_many(ProductSales, ["product_id"], list(per_product.values()))
+
+    units_by_product = {pid: row["units_sold"] for pid, row in per_product.items()}
+    if units_by_product:
+        db.session.query(Product).filter(Product.id.in_(units_by_product)).update(
+            {Product.sales_count: Product.sales_count + db.case(units_by_product, value=Product.id, else_=0)},
+            synchronize_session=False,
+        )
+
+
+def record_status_change(old_status, new_status):
+    if old_status == new_status:
+        return
+    if old_status:
+        upsert_add(OrderStatusCount, {"status": old_status}, order_count=-1)
+    upsert_add(OrderStatusCount, {"status": new_status}, order_count=1)
+
+
+def record_rating(product_id, old_stars, new_stars):
+    """Stage an in-place update of a product's rating aggregates.
+
+    `old_stars` is None for a first rating; otherwise the user's previous
+    rating is moved to the new histogram bucket without changing the count.
+    The update is a single UPDATE so concurrent raters can't lose increments.
+    """
+    if old_stars == new_stars:
+        return
+    count_delta = 0 if old_stars else 1
+    sum_delta = new_stars - (old_stars or 0)
+    values = {
+        Product.rating_count: Product.rating_count + count_delta,
+        Product.rating_sum: Product.rating_sum + sum_delta,
+        Product.rating_avg: (Product.rating_sum + sum_delta) * 1.0 / (Product.rating_count + count_delta),
+        Product.updated_at: datetime.utcnow(),
+        getattr(Product, f"rating_{new_stars}"): getattr(Product, f"rating_{new_stars}") + 1,
+    }
+    if old_stars:
+        values[getattr(Product, f"rating_{old_stars}")] = getattr(Product, f"rating_{old_stars}") - 1
+    db.session.query(Product).filter_by(id=product_id).update(values, synchronize_session=False)
+
+
+def record_comment(product_id):
+    """Stage a comment count increment (and updated_at bump) for a product."""
+    db.session.query(Product).filter_by(id=product_id).update(
+        {Product.comment_count: Product.comment_count + 1, Product.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+
+
+def rebuild_comment_counts():
+    """Recompute every product's comment_count from the Comment table."""
+    counts = db.session.query(db.func.count(Comment.id)).filter(Comment.product_id == Product.id).scalar_subquery()
+    db.session.query(Product).update({Product.comment_count: counts}, synchronize_session=False)
+
+
+def rebuild_sales_counts():
+    """Recompute every product's sales_count from the ProductSales rollup."""
+    units = db.session.query(ProductSales.units_sold).filter(ProductSales.product_id == Product.id).scalar_subquery()
+    db.session.query(Product).update({Product.sales_count: db.func.coalesce(units, 0)}, synchronize_session=False)
+
+
+def rebuild_ratings():
+    """Recompute every product's rating aggregates from the Rating table."""
+    db.session.query(Product).update({
+        Product.rating_count: 0, Product.rating_sum: 0, Product.rating_avg: 0,
+        Product.rating_1: 0, Product.rating_2: 0, Product.rating_3: 0,
+        Product.rating_4: 0, Product.rating_5: 0,
+    }, synchronize_session=False)
+
+    histograms = {}
+    for pid, stars, count in db.session.query(Rating.product_id, Rating.stars, db.func.count(Rating.id))\
+            .group_by(Rating.product_id, Rating.stars).all():
+        histograms.setdefault(pid, {})[stars] = count
+    for pid, hist in histograms.items():
+        count = sum(hist.values())
+        total = sum(stars * n for stars, n in hist.items())
+        values = {f"rating_{s}": hist.get(s, 0) for s in range(1, 6)}
+        db.session.query(Product).filter_by(id=pid).update(
+            dict(values, rating_count=count, rating_sum=total, rating_avg=total / count),
+            synchronize_session=False,
+        )
+
+
+def dashboard_totals():
+    """Return the headline dashboard numbers from the counter table in one query."""
+    values = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+    return {
+        "products": int(values.get("products", 0)),
+        "orders": int(values.get("orders", 0)),
+        "revenue": values.get("revenue", 0.0),
+        "units_sold": int(values.get("units_sold", 0)),
+    }
+
+
+def rebuild_rollups():
+    """Recompute every rollup table from the source tables (for backfills)."""
+    for model in (StatCounter, SalesDaily, ProductSales, OrderStatusCount):
+        db.session.query(model).delete()
+
+    revenue = db.session.query(db.func.sum(Order.total_amount)).scalar() or 0
+    units = db.session.query(db.func.sum(OrderItem.quantity)).scalar() or 0
+    db.session.add_all([
+        StatCounter(name="products", value=Product.query.count()),
+        StatCounter(name="orders", value=Order.query.count()),
+        StatCounter(name="revenue", value=revenue),
+        StatCounter(name="units_sold", value=units),
+    ])
+
+    day = db.func.date(Order.created_at)
+    for d, total, count in db.session.query(day, db.func.sum(Order.total_amount), db.func.count(Order.id))\
+            .group_by(day).all():
+        if d is not None:
+            d = d if not isinstance(d, str) else datetime.strptime(d, "%Y-%m-%d").date()
+            db.session.add(SalesDaily(day=d, revenue=total or 0, order_count=count))
+
+    for status, count in db.session.query(Order.status, db.func.count(Order.id)).group_by(Order.status).all():
+        if status is not None:
+            db.session.add(OrderStatusCount(status=status, order_count=count))
+
+    for pid, qty, total in db.session.query(
+            OrderItem.product_id,
+            db.func.sum(OrderItem.quantity),
+            db.func.sum(OrderItem.unit_price * OrderItem.quantity))\
+            .group_by(OrderItem.product_id).all():
+        db.session.add(ProductSales(product_id=pid, units_sold=qty or 0, revenue=total or 0))
+
+    db.session.flush()
+    rebuild_sales_counts()
+    rebuild_ratings()
+    rebuild_comment_counts()
+    db.session.commit()
+
+
+def init_rollups():
+    """Backfill the rollups once for databases created before they existed."""
+    if StatCounter.query.first() is None:
+        rebuild_rollups()
@@ -1,8 +1,12 @@
 from flask import render_template, redirect, url_for, request, flash
 from flask_login import login_required
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
-from app.models import Product, Order, OrderItem
-from app.routes.misc import admin_required, get_monthly_sales
+from app.models import Product, Order
+from app.routes.misc import admin_required, get_monthly_sales, parse_date, SALES_YEARS
+from app.pagination import keyset_page
+from app.rollups import dashboard_totals, record_status_change
 
 
 def admin_routes(app):
@@ -11,15 +15,26 @@ def admin_routes(app):
     @login_required
     @admin_required
     def admin_dashboard():
-        total_products = Product.query.count()
-        total_orders = Order.query.count()
-        total_revenue = db.session.query(db.func.sum(Order.total_amount)).scalar() or 0
-        sold_items = db.session.query(db.func.sum(OrderItem.quantity)).scalar() or 0
+        totals = dashboard_totals()
+        total_products = totals["products"]
+        total_orders = totals["orders"]
+        total_revenue = totals["revenue"]
+        sold_items = totals["units_sold"]
         total_stock = total_products * 10  # Example
         sold_percentage = round((sold_items / total_stock) * 100, 2) if total_stock > 0 else 0
-        chart_labels = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-        chart_data = get_monthly_sales()
-        products = Product.query.order_by(Product.created_at.desc()).all()
+
+        # Sales chart: a whole year by default, or an explicit date range
+        year = request.args.get("year", datetime.utcnow().year, type=int)
+        if year not in SALES_YEARS:
+            year = datetime.utcnow().year
+        start = parse_date(request.args.get("start"))
+        end = parse_date(request.args.get("end"))
+        if start and end and start <= end:
+            chart_labels, chart_data = get_monthly_sales(start=start, end=end + timedelta(days=1))
+        else:
+            start = end = None
+            chart_labels, chart_data = get_monthly_sales(year=year)
+        products, next_cursor = keyset_page(Product.query, Product, per_page=10)
         return render_template("dashboard.html",
                                total_products=total_products,
                                total_orders=total_orders,
@@ -27,22 +42,28 @@ def admin_routes(app):
                                sold_percentage=sold_percentage,
                                chart_labels=chart_labels,
                                chart_data=chart_data,
-                               products=products)
+                               year=year,
+                               start=start,
+                               end=end,
+                               products=products,
+                               next_cursor=next_cursor)
 
     @app.route("/admin/products")
     @login_required
     @admin_required
     def dashboard_products():
-        products = Product.query.order_by(Product.created_at.desc()).all()
-        return render_template("dashboard_products.html", products=products)
+        products, next_cursor = keyset_page(Product.query, Product, request.args.get("cursor"), per_page=50)
+        return render_template("dashboard_products.html", products=products, next_cursor=next_cursor)
 
 
     @app.route("/admin/orders")
     @login_required
     @admin_required
     def dashboard_orders():
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-        return render_template("dashboard_orders.html", orders=orders)
+        query = Order.query.options(joinedload(Order.user), selectinload(Order.items))
+        orders, next_cursor = keyset_page(query, Order, request.args.get("cursor"), per_page=50)
+        return render_template("dashboard_orders.html", orders=orders, next_cursor=next_cursor,
+                               total_orders=dashboard_totals()["orders"])
 
     @app.route("/admin/order/update-status/<int:order_id>", methods=["POST"])
     @login_required
@@ -51,6 +72,7 @@ def admin_routes(app):
         order = Order.query.get_or_404(order_id)
         new_status = request.form.get("status")
         if new_status in ["Pending", "Processing", "Shipped", "Delivered", "Cancelled", "Paid"]:
+            record_status_change(order.status, new_status)
             order.status = new_status
             db.session.commit()
             flash("Order status updated.", "success")
@@ -1,9 +1,11 @@
 from flask import render_template, request, redirect, url_for, flash, session, send_file
 from flask_login import login_user, logout_user
 from datetime import datetime, timedelta
-import random, string, io
-from PIL import Image, ImageDraw, ImageFont
+import random, io
 from app import db
+from app.captcha import captcha_pool
+from app.carts import merge_session_cart
+from app.identity import forget_user
 from app.models import User
 from app.routes.misc import send_email
 
@@ -12,21 +14,11 @@ def auth_routes(app):
     # ---------- CAPTCHA IMAGE GENERATOR ----------
     @app.route('/captcha-image')
     def captcha_image():
-        text = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+        text, png = captcha_pool.take()
         session['captcha'] = text
-
-        img = Image.new('RGB', (200, 70), color=(255, 255, 255))
-        draw = ImageDraw.Draw(img)
-        try:
-            font = ImageFont.truetype("arial.ttf", 50)
-        except:
-            font = ImageFont.load_default()
-        draw.text((20, 10), text, fill=(50, 50, 50), font=font)
-
-        buf = io.BytesIO()
-        img.save(buf, 'PNG')
-        buf.seek(0)
-        return send_file(buf, mimetype='image/png')
+        response = send_file(io.BytesIO(png), mimetype='image/png')
+        response.cache_control.no_store = True
+        return response
 
     @app.route("/register/account", methods=["GET","POST"])
     def register():
@@ -106,6 +98,8 @@ def auth_routes(app):
                 user = User.query.filter_by(email=email).first()
                 if user:
                     login_user(user)  # log in the user after CAPTCHA
+                    merge_session_cart(user.id)
+                    db.session.commit()
                     flash("✅ CAPTCHA verified. Welcome!", "success")
                     return redirect(url_for("index"))
                 flash("User not found", "danger")
@@ -157,6 +151,7 @@ def auth_routes(app):
             if request.form.get("newPassword") == request.form.get("confirmPassword"):
                 user.set_password(request.form.get("newPassword"))
                 db.session.commit()
+                forget_user(user.id)
                 session.clear()
                 return redirect(url_for("login"))
             flash("Passwords do not match", "warning")
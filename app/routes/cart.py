@@ -1,45 +1,71 @@
-from flask import render_template, request, redirect, url_for
+from flask import render_template, request, redirect, url_for, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models import Cart
+from app.carts import (apply_cart_changes, cart_summary, apply_session_changes,
+                       session_cart_items, session_cart_summary)
 
 def cart_routes(app):
 
+    # Anonymous visitors get the same views backed by the session cart
     @app.route("/cart")
-    @login_required
     def cart():
-        items = Cart.query.filter_by(user_id=current_user.id).all()
+        if not current_user.is_authenticated:
+            items = session_cart_items()
+            total = sum((item.product.price or 0) * item.quantity for item in items)
+            return render_template("cart.html", items=items, total=total)
+        items = Cart.query.options(joinedload(Cart.product)).filter_by(user_id=current_user.id).all()
         total = sum(item.product.price * item.quantity for item in items)
         return render_template("cart.html", items=items, total=total)
 
     @app.route("/cart/add/<int:product_id>", methods=["POST"])
-    @login_required
     def cart_add(product_id):
         qty = int(request.form.get("quantity", 1))
-        item = Cart.query.filter_by(user_id=current_user.id, product_id=product_id).first()
-        if item:
-            item.quantity += qty
-        else:
-            db.session.add(Cart(user_id=current_user.id, product_id=product_id, quantity=qty))
+        if not current_user.is_authenticated:
+            apply_session_changes(add_qty={product_id: qty})
+            return redirect(request.referrer or url_for("cart"))
+        apply_cart_changes(current_user.id, add_qty={product_id: qty})
         db.session.commit()
         return redirect(request.referrer or url_for("cart"))
 
     @app.route("/cart/update", methods=["POST"])
-    @login_required
     def cart_update():
-        for key, value in request.form.items():
-            if key.startswith("qty_"):
-                pid = int(key.replace("qty_", ""))
-                item = Cart.query.filter_by(user_id=current_user.id, product_id=pid).first()
-                if item:
-                    item.quantity = int(value)
+        quantities = {key.replace("qty_", ""): value
+                      for key, value in request.form.items() if key.startswith("qty_")}
+        if not current_user.is_authenticated:
+            apply_session_changes(set_qty=quantities)
+            return redirect(url_for("cart"))
+        apply_cart_changes(current_user.id, set_qty=quantities)
         db.session.commit()
         return redirect(url_for("cart"))
 
+    # --- Batch JSON API ---
+    # {"set": {"<product_id>": qty}, "add": {"<product_id>": qty}, "remove": [product_id]}
+    @app.route("/cart/batch", methods=["POST"])
+    def cart_batch():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify(error="Expected a JSON object."), 400
+        if not current_user.is_authenticated:
+            try:
+                apply_session_changes(set_qty=data.get("set"), add_qty=data.get("add"), remove=data.get("remove"))
+            except (TypeError, ValueError, AttributeError):
+                return jsonify(error="Quantities and product ids must be integers."), 400
+            return jsonify(session_cart_summary())
+        try:
+            apply_cart_changes(current_user.id, set_qty=data.get("set"),
+                               add_qty=data.get("add"), remove=data.get("remove"))
+            db.session.commit()
+        except (TypeError, ValueError, AttributeError):
+            db.session.rollback()
+            return jsonify(error="Quantities and product ids must be integers."), 400
+        return jsonify(cart_summary(current_user.id))
+
     @app.route("/cart/remove/<int:item_id>")
     @login_required
     def cart_remove(item_id):
-        item = Cart.query.get_or_404(item_id)
+        item = Cart.query.filter_by(id=item_id, user_id=current_user.id).first_or_404()
         db.session.delete(item)
         db.session.commit()
         return redirect(url_for("cart"))
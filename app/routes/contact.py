@@ -1,6 +1,6 @@
 from flask import render_template, request, flash, redirect, url_for
-from flask_mail import Message
-from app import mail
+from app import db
+from app.mailqueue import queue_email
 
 def contact_routes(app):
     @app.route("/contact", methods=["GET", "POST"])
@@ -15,15 +15,9 @@ def contact_routes(app):
             text_body = f"From: {email}\n\nMessage:\n{message}"
             html_body = f"<p><b>From:</b> {email}</p><p>{message}</p>"
 
-            msg = Message(subject="New Contact Message",
-                          recipients=["myy502388@gmail.com"],
-                          body=text_body,
-                          html=html_body)
-            try:
-                mail.send(msg)
-                flash("Message sent successfully!", "success")
-            except:
-                flash("Error sending message.", "danger")
+            queue_email("New Contact Message", ["myy502388@gmail.com"], text_body, html=html_body)
+            db.session.commit()
+            flash("Message sent successfully!", "success")
 
             return redirect(request.referrer or url_for("index"))
 
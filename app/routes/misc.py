@@ -1,29 +1,64 @@
 from flask import render_template, redirect, url_for, flash
 from flask_login import current_user
 from functools import wraps
-from flask_mail import Message
-from app import mail, db
-from app.models import Order
+from datetime import datetime, timedelta
+from app import db
+from app.mailqueue import queue_email
+from app.models import SalesDaily
 
 def send_email(subject, to, body):
-    mail.send(Message(subject=subject, recipients=[to], body=body))
+    queue_email(subject, to, body)
+    db.session.commit()
 
 def generate_order_number():
     import uuid
     return str(uuid.uuid4()).replace("-", "").upper()[:12]
 
-def get_monthly_sales():
-    sales = []
-    for m in range(1,13):
-        total = db.session.query(db.func.sum(Order.total_amount))\
-            .filter(db.extract("month", Order.created_at)==m).scalar() or 0
-        sales.append(total)
-    return sales
+MONTH_LABELS = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
+# Years the sales chart accepts; the range end is exclusive, so 9998 still
+# leaves room for the "next January" bound without overflowing datetime
+SALES_YEARS = range(1, 9999)
+
+def get_monthly_sales(year=None, start=None, end=None):
+    """Return (labels, totals) per month, from one GROUP BY query.
+
+    Defaults to the whole of `year` (the current year if omitted). When a
+    `start`/`end` date range is given, months across years are labelled
+    "Mon YYYY". Totals come from the SalesDaily rollup, so a year is at
+    most 366 rows regardless of order volume.
+    """
+    if start is None or end is None:
+        year = year or datetime.utcnow().year
+        start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    last = end - timedelta(microseconds=1)
+    multi_year = start.year != last.year
+
+    y = db.extract("year", SalesDaily.day)
+    m = db.extract("month", SalesDaily.day)
+    rows = db.session.query(y, m, db.func.sum(SalesDaily.revenue))\
+        .filter(SalesDaily.day >= start.date(), SalesDaily.day <= last.date())\
+        .group_by(y, m).all()
+    totals_by_month = {(int(ry), int(rm)): total or 0 for ry, rm, total in rows}
+
+    labels, sales = [], []
+    cy, cm = start.year, start.month
+    while (cy, cm) <= (last.year, last.month):
+        labels.append(f"{MONTH_LABELS[cm - 1]} {cy}" if multi_year else MONTH_LABELS[cm - 1])
+        sales.append(totals_by_month.get((cy, cm), 0))
+        cy, cm = (cy + 1, 1) if cm == 12 else (cy, cm + 1)
+    return labels, sales
+
+def parse_date(value):
+    try:
+        parsed = datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+    return parsed if parsed and parsed.year in SALES_YEARS else None
 
 def admin_required(f):
     @wraps(f)
     def wrap(*args, **kwargs):
-        if not current_user.is_authenticated or current_user.email != "myy502388@gmail.com":
+        if not current_user.is_authenticated or not current_user.is_admin:
             flash("Admin access required", "danger")
             return redirect(url_for("login"))
         return f(*args, **kwargs)
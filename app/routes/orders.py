@@ -1,24 +1,37 @@
 from flask import render_template, request, redirect, url_for, flash, session
 from flask_login import login_required, current_user
-from app.models import Order, OrderItem, Cart, Product
-from app import db, mail
-from flask_mail import Message
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import Order, OrderItem, Cart
+from app import db
+from app.rollups import record_order
+from app.inventory import reserve_cart, commit_stock
+from app.cache import cache
+from app.mailqueue import queue_email
 import uuid
 
+def cart_quantities(items):
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
 def order_routes(app):
 
     # -------- Orders List --------
     @app.route("/orders")
     @login_required
     def orders():
-        orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
+        orders = Order.query.options(selectinload(Order.items))\
+            .filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
         return render_template("orders.html", orders=orders)
 
     # -------- Cart Confirm --------
     @app.route("/cart/confirm", methods=["GET", "POST"])
     @login_required
     def cart_confirm():
-        items = Cart.query.filter_by(user_id=current_user.id).all()
+        items = Cart.query.options(joinedload(Cart.product)).filter_by(user_id=current_user.id).all()
         if not items:
             flash("Cart is empty.", "warning")
             return redirect(url_for("cart"))
@@ -30,6 +43,16 @@ def order_routes(app):
             if payment_method not in ["card", "cod"]:
                 flash("Select a valid payment method.", "danger")
                 return redirect(url_for("cart_confirm"))
+
+            # Hold the stock until checkout (or until the reservation expires)
+            touched = reserve_cart(current_user.id, cart_quantities(items))
+            if touched is None:
+                db.session.rollback()
+                flash("Some items in your cart are no longer in stock.", "danger")
+                return redirect(url_for("cart"))
+            db.session.commit()
+            cache.invalidate(*(f"product:{pid}" for pid in touched))  # stock badge changed
+
             session["payment_method"] = payment_method
             return redirect(url_for("cart_checkout"))
 
@@ -39,7 +62,7 @@ def order_routes(app):
     @app.route("/cart/checkout", methods=["GET", "POST"])
     @login_required
     def cart_checkout():
-        items = Cart.query.filter_by(user_id=current_user.id).all()
+        items = Cart.query.options(joinedload(Cart.product)).filter_by(user_id=current_user.id).all()
         if not items:
             flash("Cart is empty.", "warning")
             return redirect(url_for("cart"))
@@ -54,6 +77,13 @@ def order_routes(app):
         total_amount = total + shipping_fee
         order_status = "Paid" if payment_method == "card" else "Pending"
 
+        # Take the stock first; a short line aborts the whole order
+        tracked = [item.product_id for item in items if item.product.stock is not None]
+        if not commit_stock(current_user.id, cart_quantities(items)):
+            db.session.rollback()
+            flash("Some items in your cart are no longer in stock.", "danger")
+            return redirect(url_for("cart"))
+
         # Generate order number
         order_number = str(uuid.uuid4()).replace("-", "").upper()[:12]
 
@@ -66,11 +96,11 @@ def order_routes(app):
             payment_method=payment_method
         )
         db.session.add(order)
-        db.session.commit()
+        db.session.flush()  # assigns order.id; nothing is committed until the end
 
-        # Add items to order
-        for item in items:
-            order_item = OrderItem(
+        # Add items to order with one executemany INSERT
+        order_items = [
+            dict(
                 order_id=order.id,
                 product_id=item.product.id,
                 user_id=current_user.id,
@@ -78,13 +108,18 @@ def order_routes(app):
                 unit_price=item.product.price,
                 quantity=item.quantity
             )
-            db.session.add(order_item)
-            db.session.delete(item)  # remove from cart
-        db.session.commit()
+            for item in items
+        ]
+        db.session.execute(insert(OrderItem), order_items)
+
+        # Remove exactly the cart lines that were priced above
+        Cart.query.filter(Cart.id.in_([item.id for item in items])).delete(synchronize_session=False)
+        record_order(order, order_items)
 
-        # Send email to admin
-        order_details_html = "<br>".join([f"{oi.product_name} x {oi.quantity} = ${oi.unit_price * oi.quantity:.2f}" for oi in order.items])
-        text_body = f"New order confirmed!\nOrder Number: {order.order_number}\nCustomer: {current_user.first_name} {current_user.last_name}\nEmail: {current_user.email}\nTotal Amount: ${order.total_amount:.2f}\nPayment Method: {payment_method}\nItems:\n" + "\n".join([f"{oi.product_name} x {oi.quantity} = ${oi.unit_price * oi.quantity:.2f}" for oi in order.items])
+        # Email admin (queued in the same transaction)
+        lines = [f"{oi['product_name']} x {oi['quantity']} = ${(oi['unit_price'] or 0) * oi['quantity']:.2f}" for oi in order_items]
+        order_details_html = "<br>".join(lines)
+        text_body = f"New order confirmed!\nOrder Number: {order.order_number}\nCustomer: {current_user.first_name} {current_user.last_name}\nEmail: {current_user.email}\nTotal Amount: ${order.total_amount:.2f}\nPayment Method: {payment_method}\nItems:\n" + "\n".join(lines)
         html_body = f"""
         <h2>New Order Confirmed</h2>
         <p><b>Order Number:</b> {order.order_number}</p>
@@ -97,21 +132,24 @@ def order_routes(app):
         <h3>Items:</h3>
         <p>{order_details_html}</p>
         """
+        queue_email("New Order Confirmed - MyShop", ["myy502388@gmail.com"], text_body, html=html_body)
+
+        order_id = order.id
         try:
-            msg = Message(subject="New Order Confirmed - MyShop",
-                          recipients=["myy502388@gmail.com"],
-                          body=text_body,
-                          html=html_body)
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email send error: {e}")
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            flash("Could not place your order, please try again.", "danger")
+            return redirect(url_for("cart"))
+        # Stock badges changed, and sales_count moves the "Best selling" listings
+        cache.invalidate("catalog", *(f"product:{pid}" for pid in tracked))
 
         flash("Order placed successfully!", "success")
-        return redirect(url_for("order_confirmation", order_id=order.id))
+        return redirect(url_for("order_confirmation", order_id=order_id))
 
     # -------- Order Confirmation Page --------
     @app.route("/order/<int:order_id>/confirmation")
     @login_required
     def order_confirmation(order_id):
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.options(selectinload(Order.items)).get_or_404(order_id)
         return render_template("orders.html", order=order)
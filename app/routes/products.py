@@ -1,32 +1,101 @@
-from flask import render_template, request, redirect, url_for, flash, current_app
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
-from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
-from app.models import Product, Comment, Rating, Favorite
+from app.models import Product, Comment, Rating, Favorite, Category
 from app.routes.misc import admin_required
+from app.search import search_products
+from app.pagination import keyset_page
+from app.catalog import (sync_product_catalog, remove_product_catalog, category_products,
+                         category_facets, parse_spec_filters, parse_listing_filters, listing_products, SORTS)
+from app.images import image_url
+from app.storage import store_upload, release_upload, purge_unreferenced
+from app.cache import cache
+from app.conditional import conditional_page, catalog_version, product_version
+from app.rollups import record_product_added, record_product_removed, record_rating, record_comment
+
+COMMENTS_PER_PAGE = 10
+
+
+def product_summary(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "discount_price": product.discount_price,
+        "rating_avg": round(product.rating_avg or 0, 1),
+        "rating_count": product.rating_count,
+        "image": image_url(product.main_image),
+        "url": url_for("product_detail", product_id=product.id),
+    }
+
+
+def comment_summary(comment):
+    return {
+        "id": comment.id,
+        "name": comment.name,
+        "content": comment.content,
+        "date": comment.created_at.strftime("%b %d, %Y"),
+    }
 
 
 def product_routes(app):
 
     # ===================== HOME =====================
     @app.route("/")
+    @conditional_page(catalog_version)
+    @cache.cached_page(tags=lambda: ["catalog"])
     def index():
         products = Product.query.order_by(Product.created_at.desc()).limit(12).all()
-        return render_template("index.html", products=products, user=current_user)
+        categories = Category.query.filter(Category.product_count > 0).order_by(Category.name).all()
+        return render_template("index.html", products=products, categories=categories, user=current_user)
 
 
     # ===================== PRODUCTS LIST =====================
     @app.route("/products")
+    @conditional_page(catalog_version)
+    @cache.cached_page(tags=lambda: ["catalog"])
     def products():
-        products = Product.query.order_by(Product.created_at.desc()).all()
-        return render_template("products.html", products=products)
+        filters = parse_listing_filters(request.args)
+        products, next_cursor = listing_products(filters, request.args.get("cursor"))
+        return render_template("products.html", products=products, next_cursor=next_cursor,
+                               filters=filters, sorts=SORTS)
+
+
+    @app.route("/products/page")
+    @conditional_page(catalog_version)
+    @cache.cached_page(tags=lambda: ["catalog"])
+    def products_page():
+        products, next_cursor = listing_products(parse_listing_filters(request.args), request.args.get("cursor"))
+        return jsonify(products=[product_summary(p) for p in products], next_cursor=next_cursor)
+
+
+    # ===================== CATEGORY =====================
+    @app.route("/category/<slug>")
+    @conditional_page(lambda slug: catalog_version())
+    @cache.cached_page(tags=lambda slug: ["catalog"])
+    def category(slug):
+        category = Category.query.filter_by(slug=slug).first_or_404()
+        specs = parse_spec_filters(request.args.getlist("spec"))
+        filters = parse_listing_filters(request.args)
+        products, next_cursor = category_products(category.id, request.args.get("cursor"), specs, filters)
+
+        # Facet counts don't depend on the cursor, so logged-in visitors
+        # (who skip the page cache) still share them between pages
+        facets_key = f"facets:{category.id}:" + "|".join(f"{n}:{v}" for n, v in sorted(specs))
+        facets = cache.get_or_set(facets_key, ["catalog"], lambda: category_facets(category.id, specs))
+
+        return render_template("category.html", category=category, products=products,
+                               next_cursor=next_cursor, specs=specs, facets=facets, filters=filters)
 
 
     # ===================== PRODUCT DETAIL =====================
     @app.route("/product/<int:product_id>", methods=["GET", "POST"])
+    @conditional_page(product_version)
+    @cache.cached_page(tags=lambda product_id: [f"product:{product_id}"])
     def product_detail(product_id):
-        product = Product.query.get_or_404(product_id)
+        product = Product.query.options(selectinload(Product.category_list), selectinload(Product.specs))\
+            .filter_by(id=product_id).first_or_404()
 
         # Handle comments
         if request.method == "POST":
@@ -39,22 +108,21 @@ def product_routes(app):
                     content=body
                 )
                 db.session.add(comment)
+                record_comment(product.id)
                 db.session.commit()
+                cache.invalidate(f"product:{product.id}")
                 flash("Comment posted!", "success")
             return redirect(request.url)
 
-        # Parse categories and specifications
-        categories = product.categories.split(",") if product.categories else []
-        specifications = product.specifications.split("\n") if product.specifications else []
-
         # Collect images safely
         images = [img for img in [product.main_image, product.image2, product.image3, product.image4] if img]
 
-        # Get comments
-        comments = Comment.query.filter_by(product_id=product.id).order_by(Comment.created_at.desc()).all()
+        # First page of comments; the rest load from product_comments
+        comments, comments_cursor = keyset_page(Comment.query.filter_by(product_id=product.id), Comment,
+                                                per_page=COMMENTS_PER_PAGE)
 
         # Ratings and favorites
-        avg_rating = db.session.query(func.avg(Rating.stars)).filter_by(product_id=product.id).scalar() or 0
+        avg_rating = product.rating_avg or 0
         user_rating_obj = Rating.query.filter_by(user_id=current_user.id, product_id=product.id).first() if current_user.is_authenticated else None
         user_rating = user_rating_obj.stars if user_rating_obj else 0
         is_fav = Favorite.query.filter_by(user_id=current_user.id, product_id=product.id).first() is not None if current_user.is_authenticated else False
@@ -63,25 +131,33 @@ def product_routes(app):
             "product_detail.html",
             product=product,
             images=images,
-            categories=categories,
-            specifications=specifications,
+            categories=product.category_list,
+            specifications=product.specs,
             comments=comments,
+            comments_cursor=comments_cursor,
             avg_rating=round(avg_rating, 1),
             user_rating=user_rating,
             is_fav=is_fav
         )
 
 
+    # --- More comments (JSON) ---
+    @app.route("/product/<int:product_id>/comments")
+    @cache.cached_page(tags=lambda product_id: [f"product:{product_id}"])
+    def product_comments(product_id):
+        comments, next_cursor = keyset_page(Comment.query.filter_by(product_id=product_id), Comment,
+                                            request.args.get("cursor"), per_page=COMMENTS_PER_PAGE)
+        return jsonify(comments=[comment_summary(c) for c in comments], next_cursor=next_cursor)
+
+
     # ===================== SEARCH =====================
     @app.route("/search")
     def search():
-        q = request.args.get("q", "")
-        products = Product.query.filter(
-            (Product.name.ilike(f"%{q}%")) |
-            (Product.description.ilike(f"%{q}%")) |
-            (Product.categories.ilike(f"%{q}%"))
-        ).all()
-        return render_template("search_results.html", products=products, query=q)
+        q = request.args.get("q", "").strip()
+        page = request.args.get("page", 1, type=int)
+        products, has_next = search_products(q, page=page)
+        return render_template("search_results.html", products=products, query=q,
+                               page=page, has_next=has_next)
 
 
     # ===================== UPLOAD PRODUCT (ADMIN) =====================
@@ -95,6 +171,8 @@ def product_routes(app):
             price = float(request.form.get("price") or 0)
             discount_price = request.form.get("discount_price")
             discount_price = float(discount_price) if discount_price else None
+            stock = request.form.get("stock")
+            stock = int(stock) if stock else None  # blank = not tracked
 
             # Categories
             categories = request.form.getlist("categories[]")
@@ -110,9 +188,7 @@ def product_routes(app):
             filenames = []
             for img in images:
                 if img and img.filename != "":
-                    filename = secure_filename(img.filename)
-                    img.save(current_app.config["UPLOAD_FOLDER"] + "/" + filename)
-                    filenames.append(filename)
+                    filenames.append(store_upload(img))
                 else:
                     filenames.append(None)
 
@@ -124,13 +200,18 @@ def product_routes(app):
                 categories=categories,
                 price=price,
                 discount_price=discount_price,
+                stock=stock,
                 main_image=filenames[0],
                 image2=filenames[1],
                 image3=filenames[2],
                 image4=filenames[3]
             )
             db.session.add(product)
+            db.session.flush()
+            sync_product_catalog(product)
+            record_product_added()
             db.session.commit()
+            cache.invalidate("catalog")
             flash("Product uploaded successfully!", "success")
             return redirect(url_for("upload_product"))
 
@@ -150,6 +231,9 @@ def product_routes(app):
             product.price = float(request.form.get("price") or 0)
             discount_price = request.form.get("discount_price")
             product.discount_price = float(discount_price) if discount_price else None
+            stock = request.form.get("stock")
+            stock = int(stock) if stock else None
+            product.stock = stock
 
             # Categories
             categories = request.form.getlist("categories[]")
@@ -163,13 +247,17 @@ def product_routes(app):
             # Images
             images = [request.files.get(f"image{i}") for i in range(1, 5)]
             image_fields = ["main_image", "image2", "image3", "image4"]
+            replaced = []
             for img, field in zip(images, image_fields):
                 if img and img.filename:
-                    filename = secure_filename(img.filename)
-                    img.save(current_app.config["UPLOAD_FOLDER"] + "/" + filename)
-                    setattr(product, field, filename)
+                    replaced.append(getattr(product, field))
+                    release_upload(getattr(product, field))
+                    setattr(product, field, store_upload(img))
 
+            sync_product_catalog(product)
             db.session.commit()
+            cache.invalidate("catalog", f"product:{product.id}")
+            purge_unreferenced(replaced)
             flash("Product updated successfully!", "success")
             return redirect(url_for("product_detail", product_id=product.id))
 
@@ -182,8 +270,15 @@ def product_routes(app):
     @admin_required
     def delete_product(product_id):
         product = Product.query.get_or_404(product_id)
+        images = [product.main_image, product.image2, product.image3, product.image4]
+        for name in images:
+            release_upload(name)
+        remove_product_catalog(product.id)
         db.session.delete(product)
+        record_product_removed()
         db.session.commit()
+        cache.invalidate("catalog", f"product:{product_id}")
+        purge_unreferenced(images)
         flash("Product deleted successfully!", "success")
         return redirect(url_for("index"))
 
@@ -193,12 +288,16 @@ def product_routes(app):
     @login_required
     def rate_product(product_id, stars):
         stars = max(1, min(5, stars))
+        Product.query.get_or_404(product_id)
         rating = Rating.query.filter_by(user_id=current_user.id, product_id=product_id).first()
         if rating:
+            record_rating(product_id, rating.stars, stars)
             rating.stars = stars
         else:
             db.session.add(Rating(user_id=current_user.id, product_id=product_id, stars=stars))
+            record_rating(product_id, None, stars)
         db.session.commit()
+        cache.invalidate("catalog", f"product:{product_id}")
         flash("Rating saved!", "success")
         return redirect(request.referrer)
 
@@ -222,6 +321,7 @@ def product_routes(app):
     @app.route("/favorites")
     @login_required
     def favorites():
-        favs = Favorite.query.filter_by(user_id=current_user.id).all()
+        favs = Favorite.query.options(joinedload(Favorite.product))\
+            .filter_by(user_id=current_user.id).all()
         products = [f.product for f in favs]
         return render_template("favorites.html", products=products)
@@ -1,39 +1,50 @@
 from flask import render_template, request, redirect, url_for
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 from app import db
-import os
+from app.models import User
+from app.identity import forget_user
+from app.storage import store_upload, release_upload, purge_unreferenced
 
 def profile_routes(app):
 
+    # current_user is a cached snapshot, so writes go through the real row
+
     @app.route("/profile", methods=["GET","POST"])
     @login_required
     def profile():
         if request.method == "POST":
-            current_user.first_name = request.form.get("firstName")
-            current_user.last_name = request.form.get("lastName")
-            current_user.phone = request.form.get("phone")
+            user = db.session.get(User, current_user.id)
+            user.first_name = request.form.get("firstName")
+            user.last_name = request.form.get("lastName")
+            user.phone = request.form.get("phone")
             db.session.commit()
+            forget_user(user.id)
+            return render_template("profile.html", user=user)
         return render_template("profile.html", user=current_user)
 
     @app.route("/profile/change-location", methods=["POST"])
     @login_required
     def change_location():
-        current_user.country = request.form.get("country")
-        current_user.province = request.form.get("province")
-        current_user.city = request.form.get("city")
-        current_user.zip_code = request.form.get("zip_code")
-        current_user.address = request.form.get("address")
+        user = db.session.get(User, current_user.id)
+        user.country = request.form.get("country")
+        user.province = request.form.get("province")
+        user.city = request.form.get("city")
+        user.zip_code = request.form.get("zip_code")
+        user.address = request.form.get("address")
         db.session.commit()
+        forget_user(user.id)
         return redirect(url_for("profile"))
 
     @app.route("/change-photo", methods=["POST"])
     @login_required
     def change_photo():
         photo = request.files.get("photo")
-        if photo:
-            filename = secure_filename(photo.filename)
-            photo.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
-            current_user.photo = filename
+        if photo and photo.filename:
+            user = db.session.get(User, current_user.id)
+            old_photo = user.photo
+            release_upload(old_photo)
+            user.photo = store_upload(photo)
             db.session.commit()
+            forget_user(user.id)
+            purge_unreferenced([old_photo])
         return redirect(url_for("profile"))
@@ -0,0 +1,102 @@
+# app/search.py
+import re
+from sqlalchemy import text
+from app import db
+from app.models import Product
+
+# ===================== FULL-TEXT SEARCH =====================
+# On SQLite the catalog is indexed in an FTS5 table kept in sync with the
+# product table by triggers, so upload/edit/delete never need to touch it.
+# Other databases fall back to the old ILIKE scan.
+
+FTS_TABLE = "product_fts"
+SEARCH_PER_PAGE = 24
+
+_FTS_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, categories,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, categories)
+        VALUES (new.id, new.name, new.description, new.categories);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, categories)
+        VALUES ('delete', old.id, old.name, old.description, old.categories);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, description, categories ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, categories)
+        VALUES ('delete', old.id, old.name, old.description, old.categories);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, categories)
+        VALUES (new.id, new.name, new.description, new.categories);
+    END""",
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_enabled():
+    return db.engine.dialect.name == "sqlite"
+
+
+def init_search():
+    """Create the FTS index and triggers, backfilling existing products."""
+    if not fts_enabled():
+        return
+    with db.engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"),
+            {"n": FTS_TABLE},
+        ).first()
+        for stmt in _FTS_SETUP:
+            conn.execute(text(stmt))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def rebuild_search_index():
+    if fts_enabled():
+        with db.engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query where every word is a prefix match."""
+    tokens = _TOKEN_RE.findall(q or "")
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def search_products(q, page=1, per_page=SEARCH_PER_PAGE):
+    """Return (products, has_next) for the given page of ranked results."""
+    page = max(1, page)
+    offset = (page - 1) * per_page
+
+    if not fts_enabled():
+        products = Product.query.filter(
+            (Product.name.ilike(f"%{q}%")) |
+            (Product.description.ilike(f"%{q}%")) |
+            (Product.categories.ilike(f"%{q}%"))
+        ).order_by(Product.id.desc()).offset(offset).limit(per_page + 1).all()
+        return products[:per_page], len(products) > per_page
+
+    match = build_match_query(q)
+    if not match:
+        return [], False
+
+    # bm25 weights: name matches rank above categories, then description
+    rows = db.session.execute(
+        text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 5.0) LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "limit": per_page + 1, "offset": offset},
+    ).scalars().all()
+
+    has_next = len(rows) > per_page
+    ids = rows[:per_page]
+    if not ids:
+        return [], False
+    by_id = {p.id: p for p in Product.query.filter(Product.id.in_(ids)).all()}
+    return [by_id[i] for i in ids if i in by_id], has_next
@@ -0,0 +1,179 @@
+# app/storage.py
+import hashlib
+import os
+import re
+import tempfile
+from flask import current_app, Request
+from werkzeug.exceptions import UnsupportedMediaType
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import StoredFile
+from app.images import schedule_variants, remove_variants
+from app.upsert import upsert_add
+
+# ===================== CONTENT-ADDRESSED UPLOADS =====================
+# Uploads are stored as <sha256 prefix>.<ext>, so identical images share one
+# file and different images can never overwrite each other. Because a name
+# always maps to the same bytes, these URLs are served as immutable.
+
+HASH_LENGTH = 32
+HASHED_NAME_RE = re.compile(rf"^(variants/)?[0-9a-f]{{{HASH_LENGTH}}}\.[a-z0-9]+(-\d+\.[a-z0-9]+)?$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename or ""))[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,8}", ext) else ".bin"
+
+
+def is_hashed_name(name):
+    return bool(name and HASHED_NAME_RE.match(name))
+
+
+# ===================== STREAMING UPLOADS =====================
+# Multipart file parts are written straight to a temp file in
+# UPLOAD_TMP_FOLDER while being hashed and sniffed, so a request holds one
+# parser buffer in memory rather than whole files, a non-image is rejected
+# after its first bytes, and storing it is a rename instead of a copy. The
+# temp folder lives under the instance folder, outside the static tree, so
+# a file is only ever served once it has been validated and stored.
+
+HEADER_BYTES = 16
+
+
+class UploadRejected(UnsupportedMediaType):
+    description = "Only JPEG, PNG, GIF, WebP and AVIF images can be uploaded."
+
+
+def sniff_image(head):
+    """Return True if `head` starts with the signature of a supported image format."""
+    return (
+        head.startswith(b"\xff\xd8\xff")
+        or head.startswith(b"\x89PNG\r\n\x1a\n")
+        or head[:6] in (b"GIF87a", b"GIF89a")
+        or (head[:4] == b"RIFF" and head[8:12] == b"WEBP")
+        or (head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"))
+    )
+
+
+class IncomingUpload:
+    """Writable temp file that hashes and validates data as the parser streams it in."""
+
+    def __init__(self, tmp_folder):
+        os.makedirs(tmp_folder, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=tmp_folder, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+        self.digest = hashlib.sha256()
+        self.head = b""
+
+    def write(self, data):
+        if len(self.head) < HEADER_BYTES:
+            self.head += data[:HEADER_BYTES - len(self.head)]
+            if len(self.head) >= HEADER_BYTES and not sniff_image(self.head):
+                self.discard()
+                raise UploadRejected()
+        self.digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def valid(self):
+        return sniff_image(self.head)
+
+    def move_to(self, dest):
+        self._file.close()
+        # mkstemp() creates the file 0600; the web server must be able to read it
+        os.chmod(self.path, 0o644)
+        os.replace(self.path, dest)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        self.discard()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = IncomingUpload(current_app.config["UPLOAD_TMP_FOLDER"])
+        self.__dict__.setdefault("_incoming_uploads", []).append(upload)
+        return upload
+
+    def _load_form_data(self):
+        # A part rejected mid-body aborts the parse before the parts already
+        # streamed reach request.files, so the teardown would never close them
+        try:
+            super()._load_form_data()
+        except BaseException:
+            for upload in self.__dict__.get("_incoming_uploads", ()):
+                upload.discard()
+            raise
+
+
+def store_upload(file_storage):
+    """Save an uploaded file under its content hash and take a reference to it.
+
+    Returns the stored name. The refcount change is staged on the session
+    and becomes permanent when the caller commits.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, IncomingUpload):
+        if not stream.valid:
+            stream.discard()
+            raise UploadRejected()
+        digest = stream.digest
+    else:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+        stream.seek(0)
+
+    name = digest.hexdigest()[:HASH_LENGTH] + _extension(file_storage.filename)
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], name)
+    if os.path.exists(path):
+        if isinstance(stream, IncomingUpload):
+            stream.discard()
+    else:
+        if isinstance(stream, IncomingUpload):
+            stream.move_to(path)
+        else:
+            file_storage.save(path)
+        schedule_variants(name)
+
+    upsert_add(StoredFile, {"name": name}, refcount=1)
+    return name
+
+
+def release_upload(name):
+    """Drop one reference to a stored file (legacy, non-hashed names are ignored)."""
+    if not is_hashed_name(name):
+        return
+    db.session.query(StoredFile).filter_by(name=name)\
+        .update({StoredFile.refcount: StoredFile.refcount - 1}, synchronize_session=False)
+
+
+def purge_unreferenced(names):
+    """Delete files (and their variants) whose refcount has dropped to zero.
+
+    Call after the commit that released them. The row is removed with a
+    conditional DELETE first, so a concurrent upload that re-referenced the
+    file keeps it.
+    """
+    folder = current_app.config["UPLOAD_FOLDER"]
+    for name in set(filter(is_hashed_name, names)):
+        deleted = db.session.query(StoredFile)\
+            .filter(StoredFile.name == name, StoredFile.refcount <= 0)\
+            .delete(synchronize_session=False)
+        db.session.commit()
+        if deleted:
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                os.remove(path)
+            remove_variants(folder, name)
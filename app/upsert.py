@@ -0,0 +1,69 @@
+# app/upsert.py
+from types import SimpleNamespace
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+# ===================== UPSERTS =====================
+# INSERT ... ON CONFLICT on the model's unique key where the database has
+# it (SQLite, Postgres), so concurrent writers can't race a read-then-write.
+# Other databases get an UPDATE-then-INSERT fallback. Rows passed to one
+# call must have distinct keys.
+
+
+def dialect_insert(bind):
+    """The ON CONFLICT-capable insert() for this connection's dialect, or None."""
+    return {"sqlite": sqlite.insert, "postgresql": postgresql.insert}.get(bind.dialect.name)
+
+
+def _upsert_many(model, key_columns, rows, set_values):
+    insert_ = dialect_insert(db.session.get_bind())
+    if insert_ is not None:
+        stmt = insert_(model).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=list(key_columns),
+                                                      set_=set_values(stmt.excluded)))
+        return
+
+    for row in rows:
+        key = {col: row[col] for col in key_columns}
+        updated = db.session.query(model).filter_by(**key)\
+            .update(set_values(SimpleNamespace(**row)), synchronize_session=False)
+        if not updated:
+            db.session.add(model(**row))
+
+
+def upsert_add_many(model, key_columns, rows):
+    """Atomically add each row's non-key values to the matching row, creating missing rows."""
+    if not rows:
+        return
+    deltas = [col for col in rows[0] if col not in key_columns]
+    _upsert_many(model, key_columns, rows,
+                 lambda new: {col: getattr(model, col) + getattr(new, col) for col in deltas})
+
+
+def upsert_add(model, key, **deltas):
+    """Atomically add `deltas` to the row identified by `key`, creating it if missing."""
+    upsert_add_many(model, list(key), [dict(key, **deltas)])
+
+
+def upsert_set_many(model, key_columns, rows, columns):
+    """Insert rows, overwriting `columns` of any row that already has the same key."""
+    if rows:
+        _upsert_many(model, key_columns, rows, lambda new: {col: getattr(new, col) for col in columns})
+
+
+def insert_missing(conn, model, key_columns, rows):
+    """Insert the rows whose key is not taken yet, leaving existing rows alone."""
+    if not rows:
+        return
+    insert_ = dialect_insert(conn)
+    if insert_ is not None:
+        conn.execute(insert_(model).values(rows).on_conflict_do_nothing(index_elements=list(key_columns)))
+        return
+
+    key = tuple_(*(getattr(model, col) for col in key_columns))
+    wanted = [tuple(row[col] for col in key_columns) for row in rows]
+    existing = set(conn.execute(select(*(getattr(model, col) for col in key_columns)).where(key.in_(wanted))).all())
+    missing = [row for row, k in zip(rows, wanted) if k not in existing]
+    if missing:
+        conn.execute(insert(model), missing)
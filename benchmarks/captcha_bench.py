@@ -0,0 +1,67 @@
+"""Compare per-request captcha cost: inline rendering vs. the pre-rendered pool.
+
+    python benchmarks/captcha_bench.py [requests]
+
+"render" reproduces the work the previous handler did per request (font
+lookup, draw, PNG encode); "pool take" is what the handler does now; the
+last line is a full /captcha-image request through the Flask test client
+with a warm pool, including routing and session overhead.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("MAIL_QUEUE_WORKER", "False")
+
+from PIL import ImageFont  # noqa: E402
+from app import create_app  # noqa: E402
+from app.captcha import captcha_pool, random_text, render_captcha  # noqa: E402
+import app.captcha as captcha  # noqa: E402
+
+
+def per_request_ms(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) * 1000 / n
+
+
+def old_handler():
+    try:
+        captcha.FONT = ImageFont.truetype("arial.ttf", 50)
+    except OSError:
+        captcha.FONT = ImageFont.load_default()
+    render_captcha(random_text())
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = create_app()
+    client = app.test_client()
+
+    old = per_request_ms(old_handler, n)
+    captcha.FONT = captcha._load_font()
+
+    def fill_pool():
+        captcha_pool.size = n
+        captcha_pool.init_app(app)
+        captcha_pool.take()
+        while captcha_pool._queue.qsize() < n - 1:  # wait for the worker to refill
+            time.sleep(0.05)
+
+    fill_pool()
+    take = per_request_ms(captcha_pool.take, n - 1)
+    fill_pool()
+    request = per_request_ms(lambda: client.get("/captcha-image"), n - 1)
+
+    print(f"requests: {n}")
+    print(f"render (old handler):     {old:.3f} ms/request")
+    print(f"pool take (new handler):  {take:.3f} ms/request")
+    print(f"full request, warm pool:  {request:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
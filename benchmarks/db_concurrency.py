@@ -0,0 +1,130 @@
+"""Compare throughput under concurrent reads and checkouts with and without engine tuning.
+
+    python benchmarks/db_concurrency.py [--workers 8] [--seconds 10] [--write-ratio 0.2]
+
+Runs the same workload twice on fresh SQLite databases, once with
+DB_ENGINE_TUNING=False (driver defaults: rollback journal,
+synchronous=FULL) and once with the tuned engine (WAL,
+synchronous=NORMAL, busy timeout, mmap). Each worker is a separate
+process, as under a multi-worker WSGI server, logged in as its own user.
+In a loop it either views a product page and its cart, or places an
+order (add to cart, confirm, check out).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def worker(user_id, product_ids, args, start_at, queue):
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["_user_id"] = str(user_id)
+    rng = random.Random(user_id)
+    results = []
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + args.seconds
+    while time.time() < deadline:
+        pid = rng.choice(product_ids)
+        write = rng.random() < args.write_ratio
+        start = time.perf_counter()
+        try:
+            if write:
+                statuses = [
+                    client.post("/cart/batch", json={"add": {str(pid): 1}}).status_code,
+                    client.post("/cart/confirm", data={"payment_method": "card"}).status_code,
+                    client.post("/cart/checkout").status_code,
+                ]
+            else:
+                statuses = [client.get(f"/product/{pid}").status_code, client.get("/cart").status_code]
+            ok = all(code < 500 for code in statuses)
+        except Exception:
+            ok = False
+        results.append(("write" if write else "read", ok, time.perf_counter() - start))
+    queue.put(results)
+
+
+def run_once(args):
+    """Run the workload in this process and print a JSON summary."""
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    from app.models import Product, User
+
+    app = create_app()
+    with app.app_context():
+        products = [Product(name=f"Bench item {i}", description="benchmark", price=10 + i, discount_price=0,
+                            main_image="pro.jpg") for i in range(args.products)]
+        users = [User(email=f"db{i}@bench.local", password_hash="x") for i in range(args.workers)]
+        db.session.add_all(products + users)
+        db.session.commit()
+        product_ids, user_ids = [p.id for p in products], [u.id for u in users]
+
+        db.engine.dispose()
+
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    start_at = time.time() + 5  # let every worker finish create_app() first
+    procs = [ctx.Process(target=worker, args=(uid, product_ids, args, start_at, queue)) for uid in user_ids]
+    for p in procs:
+        p.start()
+    results = [r for _ in procs for r in queue.get()]
+    for p in procs:
+        p.join()
+
+    summary = {}
+    for kind in ("read", "write"):
+        latencies = sorted(elapsed for k, ok, elapsed in results if k == kind and ok)
+        summary[kind] = {
+            "ok": len(latencies),
+            "errors": sum(1 for k, ok, _ in results if k == kind and not ok),
+            "per_sec": len(latencies) / args.seconds,
+            "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+        }
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_once(args)
+        return
+
+    print(f"workers={args.workers} seconds={args.seconds} write_ratio={args.write_ratio}")
+    for label, tuning in (("before (driver defaults)", "False"), ("after (tuned engine)", "True")):
+        env = dict(os.environ, DB_ENGINE_TUNING=tuning, MAIL_QUEUE_WORKER="False", CAPTCHA_POOL_SIZE="0",
+                   DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"] + sys.argv[1:],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        summary = json.loads(out.strip().splitlines()[-1])
+        print(label)
+        for kind, s in summary.items():
+            print(f"  {kind:5} {s['per_sec']:8.1f}/s  ok={s['ok']:<6} errors={s['errors']:<5} "
+                  f"p50={s['p50_ms']:.1f}ms p95={s['p95_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
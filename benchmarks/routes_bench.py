@@ -0,0 +1,199 @@
+"""Drive the hot routes against a seeded database and report latency percentiles.
+
+    python benchmarks/routes_bench.py [--db /tmp/shop.db] [--requests 200] [--concurrency 1]
+                                      [--routes index,search,...] [--no-page-cache]
+                                      [--json results.json] [--baseline old.json --tolerance 0.25]
+
+With no --db, or a --db file that does not exist yet, the database is
+seeded first (see seed.py for the scale options, e.g. --products 100000
+--orders 1000000). Reuse the same --db across runs to skip seeding.
+
+Each route is requested --requests times through the Flask test client
+from --concurrency threads, each logged in as its own user where the
+route needs one. For checkout, only the POST /cart/checkout is timed;
+filling the cart and confirming it happen beforehand. Anonymous pages
+go through the page cache unless --no-page-cache is given.
+
+The report lists p50/p95/p99 latency and throughput per route. --json
+saves it. Given --baseline, the run exits non-zero if any route's p95
+is more than --tolerance slower than the saved one.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import seed as seeding  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))]
+
+
+class Context:
+    """Ids the route drivers pick from."""
+
+    def __init__(self, app, seed):
+        from app import db
+        from app.models import User, Product
+        with app.app_context():
+            self.admin_id = db.session.query(User.id).filter_by(is_admin=True).order_by(User.id).limit(1).scalar()
+            self.user_ids = [uid for (uid,) in db.session.query(User.id).filter_by(is_admin=False)
+                             .order_by(User.id).limit(256)]
+            low, high = db.session.query(db.func.min(Product.id), db.func.max(Product.id)).one()
+        self.product_ids = range(low, high + 1)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def product_id(self):
+        with self.lock:
+            return self.rng.choice(self.product_ids)
+
+    def word(self):
+        with self.lock:
+            return self.rng.choice(seeding.WORDS)
+
+
+def _fill_cart(client, ctx, lines=3):
+    client.post("/cart/batch", json={"add": {str(ctx.product_id()): 1 for _ in range(lines)}})
+
+
+def _checkout(client, ctx):
+    _fill_cart(client, ctx, lines=2)
+    client.post("/cart/confirm", data={"payment_method": "card"})
+    return lambda: client.post("/cart/checkout")
+
+
+# name -> (who is logged in, per-thread setup, per-request function returning a timed callable)
+ROUTES = {
+    "index": ("anon", None, lambda c, ctx: lambda: c.get("/")),
+    "products": ("anon", None, lambda c, ctx: lambda: c.get("/products")),
+    "products_price": ("anon", None, lambda c, ctx: lambda: c.get("/products?min_price=50&max_price=200&sort=price_asc")),
+    "products_popular": ("anon", None, lambda c, ctx: lambda: c.get("/products?sort=popular&discounted=1")),
+    "category": ("anon", None, lambda c, ctx: lambda: c.get("/category/electronics?spec=Size:M")),
+    "search": ("anon", None, lambda c, ctx: (lambda q: lambda: c.get(f"/search?q={q}"))(ctx.word())),
+    "product_detail": ("user", None, lambda c, ctx: (lambda pid: lambda: c.get(f"/product/{pid}"))(ctx.product_id())),
+    "cart": ("user", _fill_cart, lambda c, ctx: lambda: c.get("/cart")),
+    "checkout": ("user", None, _checkout),
+    "admin_dashboard": ("admin", None, lambda c, ctx: lambda: c.get("/admin/dashboard")),
+    "admin_orders": ("admin", None, lambda c, ctx: lambda: c.get("/admin/orders")),
+}
+
+
+def run_route(app, ctx, name, requests, concurrency, warmup):
+    who, setup, make_request = ROUTES[name]
+    latencies, errors = [], []
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index, count):
+        client = app.test_client()
+        user_id = {"anon": None, "admin": ctx.admin_id}.get(who, ctx.user_ids[index % len(ctx.user_ids)])
+        if user_id is not None:
+            with client.session_transaction() as s:
+                s["_user_id"] = str(user_id)
+        if setup:
+            setup(client, ctx)
+        for _ in range(warmup):
+            make_request(client, ctx)()
+        barrier.wait()
+        for _ in range(count):
+            call = make_request(client, ctx)
+            start = time.perf_counter()
+            response = call()
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 500 or (name == "checkout" and "/confirmation" not in (response.location or "")):
+                errors.append(response.status_code)
+            latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_thread)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "per_sec": len(latencies) / wall if wall else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="SQLite file; seeded if it does not exist")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--no-page-cache", action="store_true")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs. the baseline")
+    seeding.add_arguments(parser)
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(tempfile.mkdtemp(), "bench.db"))
+    needs_seed = not os.path.exists(db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["MAIL_QUEUE_WORKER"] = "False"
+    os.environ["SLOW_QUERY_MS"] = "0"
+    os.environ["CAPTCHA_POOL_SIZE"] = "1"
+    if args.no_page_cache:
+        os.environ["CACHE_ENABLED"] = "False"
+
+    from app import create_app
+    app = create_app()
+    if needs_seed:
+        print(f"Seeding {db_path}")
+        with app.app_context():
+            seeding.seed(args)
+
+    ctx = Context(app, args.seed)
+    names = [n.strip() for n in args.routes.split(",") if n.strip()]
+    unknown = set(names) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))} (choose from {', '.join(ROUTES)})")
+
+    print(f"requests={args.requests} concurrency={args.concurrency} page_cache={not args.no_page_cache}")
+    print(f"{'route':16} {'reqs':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    results = {}
+    for name in names:
+        r = results[name] = run_route(app, ctx, name, args.requests, args.concurrency, args.warmup)
+        print(f"{name:16} {r['requests']:>6} {r['errors']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['per_sec']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "routes": results}, f, indent=2)
+
+    failed = any(r["errors"] for r in results.values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["routes"]
+        for name, r in results.items():
+            if name in baseline and baseline[name]["p95_ms"]:
+                change = r["p95_ms"] / baseline[name]["p95_ms"] - 1
+                regressed = change > args.tolerance
+                failed |= regressed
+                print(f"{'REGRESSION' if regressed else 'ok':10} {name:16} p95 {baseline[name]['p95_ms']:.1f} -> "
+                      f"{r['p95_ms']:.1f} ms ({change:+.0%})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
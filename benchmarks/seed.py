@@ -0,0 +1,142 @@
+"""Fill a database with synthetic users, products, orders, comments and ratings.
+
+    python benchmarks/seed.py --db /tmp/shop.db [--products 100000] [--orders 1000000] ...
+
+Rows are written with chunked executemany INSERTs and the catalog tables
+and rollups are rebuilt once at the end, so large scales take minutes
+rather than hours.
+The first user (bench0@bench.local) is an admin. Every account's password
+is "bench". routes_bench.py calls seed() when its database is empty.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("red blue black white cotton leather smart wireless classic slim sport travel "
+         "kitchen garden phone shirt watch shoes bag lamp chair headphones jacket bottle "
+         "camera charger mug desk pillow backpack sneakers laptop keyboard").split()
+SIZES = ("S", "M", "L", "XL")
+CATEGORIES = ("Men", "Women", "Electronics", "Home", "Sports", "Kids", "Beauty", "Books")
+STATUSES = ("Pending", "Paid", "Shipped", "Delivered", "Cancelled")
+
+
+def add_arguments(parser):
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--ratings", type=int, default=50000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def _insert(model, rows, chunk, log):
+    from sqlalchemy import insert
+    from app import db
+    start = time.perf_counter()
+    for i in range(0, len(rows), chunk):
+        db.session.execute(insert(model), rows[i:i + chunk])
+        db.session.commit()
+    log(f"  {model.__tablename__:12} {len(rows):>9} rows  {time.perf_counter() - start:6.1f}s")
+
+
+def seed(args, log=print):
+    """Insert the rows described by args into the app's database (app context required)."""
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.models import User, Product, Order, OrderItem, Comment, Rating
+    from app.rollups import rebuild_rollups
+    from app.catalog import rebuild_catalog
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    def moment(days=730):
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    password = generate_password_hash("bench")
+    users = [dict(email=f"bench{i}@bench.local", password_hash=password, first_name=f"Bench{i}",
+                  last_name="User", is_admin=(i == 0), created_at=moment()) for i in range(args.users)]
+    _insert(User, users, args.chunk, log)
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like("bench%@bench.local"))]
+
+    first_product = (db.session.query(db.func.max(Product.id)).scalar() or 0) + 1
+    product_ids = range(first_product, first_product + args.products)
+    products, prices = [], []
+    for i in range(args.products):
+        created = moment()
+        price = round(rng.uniform(5, 500), 2)
+        prices.append(price)
+        name = " ".join(rng.sample(WORDS, 3)).title()
+        products.append(dict(
+            id=product_ids[i], name=f"{name} {i}", description=" ".join(rng.choices(WORDS, k=20)),
+            specifications=f"Size: {rng.choice(SIZES)}\nColor: {rng.choice(WORDS)}",
+            categories=",".join(rng.sample(CATEGORIES, 2)),
+            price=price, discount_price=round(price * rng.choice((0, 0, 0.1, 0.25)), 2), main_image="pro.jpg",
+            created_at=created, updated_at=created,
+        ))
+    _insert(Product, products, args.chunk, log)
+
+    first_order = (db.session.query(db.func.max(Order.id)).scalar() or 0) + 1
+    orders, items = [], []
+    for n in range(args.orders):
+        order_id, user_id, total = first_order + n, rng.choice(user_ids), 0.0
+        for _ in range(rng.randint(1, 3)):
+            index, qty = rng.randrange(args.products), rng.randint(1, 3)
+            total += prices[index] * qty
+            items.append(dict(order_id=order_id, product_id=product_ids[index], user_id=user_id,
+                              product_name=products[index]["name"], unit_price=prices[index], quantity=qty))
+        orders.append(dict(id=order_id, order_number=f"B{args.seed}-{order_id:010d}", user_id=user_id,
+                           total_amount=round(total, 2), shipping=0.0, status=rng.choice(STATUSES),
+                           payment_method=rng.choice(("card", "cod")), created_at=moment()))
+    _insert(Order, orders, args.chunk, log)
+    _insert(OrderItem, items, args.chunk, log)
+    del orders, items
+
+    comments = [dict(product_id=rng.choice(product_ids), user_id=rng.choice(user_ids), name="Bench",
+                     content=" ".join(rng.choices(WORDS, k=12)), created_at=moment())
+                for _ in range(args.comments)]
+    _insert(Comment, comments, args.chunk, log)
+
+    pairs = set()
+    limit = min(args.ratings, len(user_ids) * args.products)
+    while len(pairs) < limit:
+        pairs.add((rng.choice(user_ids), rng.choice(product_ids)))
+    ratings = [dict(user_id=u, product_id=p, stars=rng.choices((1, 2, 3, 4, 5), (1, 1, 2, 4, 4))[0],
+                    created_at=moment()) for u, p in pairs]
+    _insert(Rating, ratings, args.chunk, log)
+
+    start = time.perf_counter()
+    with db.engine.begin() as conn:
+        rebuild_catalog(conn)
+    log(f"  catalog tables         {time.perf_counter() - start:6.1f}s")
+
+    start = time.perf_counter()
+    rebuild_rollups()
+    if db.engine.dialect.name == "sqlite":
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    log(f"  rollups + ANALYZE      {time.perf_counter() - start:6.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", required=True, help="SQLite file to create (use a new file for each seed)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault("MAIL_QUEUE_WORKER", "False")
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        seed(args)
+
+
+if __name__ == "__main__":
+    main()
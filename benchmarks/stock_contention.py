@@ -0,0 +1,87 @@
+"""Hammer one hot product from many threads and check nothing is oversold.
+
+    python benchmarks/stock_contention.py [--buyers 64] [--stock 50] [--qty 2]
+
+Every buyer is a separate user with its own test client. Each one adds the
+product to their cart, confirms (reserving stock) and checks out. The run
+fails if the orders placed exceed the starting stock, or if stock, counters
+and order items disagree afterwards.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("MAIL_QUEUE_WORKER", "False")
+
+from app import create_app, db  # noqa: E402
+from app.models import Product, User, OrderItem  # noqa: E402
+
+
+def buyer(app, user_id, product_id, qty, barrier, results):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["_user_id"] = str(user_id)
+    barrier.wait()
+    start = time.perf_counter()
+    client.post(f"/cart/add/{product_id}", data={"quantity": qty})
+    client.post("/cart/confirm", data={"payment_method": "card"})
+    response = client.post("/cart/checkout")
+    elapsed = time.perf_counter() - start
+    placed = response.status_code == 302 and "/confirmation" in response.location
+    results.append((placed, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=64)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--qty", type=int, default=2)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        product = Product(name="Hot item", price=10, discount_price=0, stock=args.stock)
+        db.session.add(product)
+        users = [User(email=f"buyer{i}@bench.local", password_hash="x") for i in range(args.buyers)]
+        db.session.add_all(users)
+        db.session.commit()
+        product_id, user_ids = product.id, [u.id for u in users]
+
+    barrier = threading.Barrier(args.buyers)
+    results = []
+    threads = [threading.Thread(target=buyer, args=(app, uid, product_id, args.qty, barrier, results))
+               for uid in user_ids]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    with app.app_context():
+        product = db.session.get(Product, product_id)
+        sold = db.session.query(db.func.sum(OrderItem.quantity)).filter_by(product_id=product_id).scalar() or 0
+        final_stock, reserved = product.stock, product.stock_reserved
+
+    placed = sum(1 for ok, _ in results if ok)
+    latencies = sorted(elapsed for _, elapsed in results)
+    print(f"buyers={args.buyers} stock={args.stock} qty={args.qty}")
+    print(f"orders placed: {placed}  units sold: {sold}  final stock: {final_stock}  reserved: {reserved}")
+    print(f"latency ms: p50={statistics.median(latencies) * 1000:.1f} "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} max={latencies[-1] * 1000:.1f}  wall={wall:.2f}s")
+
+    expected_orders = min(args.buyers, args.stock // args.qty)
+    ok = (sold <= args.stock and final_stock == args.stock - sold and final_stock >= 0
+          and sold == placed * args.qty and placed == expected_orders)
+    print("OK: no overselling" if ok else "FAIL: inventory is inconsistent")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""The statements a page issues must not grow with the rows it lists.
+
+Each page is requested for an account with one row and for one with
+several; a relationship loaded per row (an N+1) shows up as a
+difference in the counts.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("MAIL_QUEUE_WORKER", "False")
+os.environ.setdefault("CAPTCHA_POOL_SIZE", "1")
+os.environ.setdefault("CACHE_ENABLED", "False")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Product, Order, OrderItem, Cart, Favorite  # noqa: E402
+
+MANY = 5
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        products = [Product(name=f"Product {i}", price=10 + i, discount_price=0, main_image="pro.jpg")
+                    for i in range(MANY)]
+        admin = User(email="admin@test.local", first_name="Admin", last_name="T", is_admin=True)
+        one = User(email="one@test.local", first_name="One", last_name="T")
+        many = User(email="many@test.local", first_name="Many", last_name="T")
+        for user in (admin, one, many):
+            user.set_password("x")
+        db.session.add_all(products + [admin, one, many])
+        db.session.flush()
+
+        for user, count in ((one, 1), (many, MANY)):
+            for i, product in enumerate(products[:count]):
+                order = Order(order_number=f"T-{user.id}-{i}", user_id=user.id, total_amount=product.price,
+                              shipping=0.0, status="Pending", payment_method="cod")
+                db.session.add(order)
+                db.session.flush()
+                db.session.add(OrderItem(order_id=order.id, product_id=product.id, user_id=user.id,
+                                         product_name=product.name, unit_price=product.price, quantity=1))
+                db.session.add(Cart(user_id=user.id, product_id=product.id, quantity=1))
+                db.session.add(Favorite(user_id=user.id, product_id=product.id))
+        db.session.commit()
+        app.config["TEST_USERS"] = {"admin": admin.id, "one": one.id, "many": many.id}
+    return app
+
+
+def statement_count(app, user_id, path):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["_user_id"] = str(user_id)
+        s["_fresh"] = True
+    client.get(path)  # warm the identity cache and any lazy setup
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert response.status_code == 200, f"{path} returned {response.status_code}"
+    return len(statements)
+
+
+@pytest.mark.parametrize("path", ["/orders", "/cart", "/cart/confirm", "/favorites"])
+def test_user_pages_issue_constant_statements(app, path):
+    users = app.config["TEST_USERS"]
+    assert statement_count(app, users["one"], path) == statement_count(app, users["many"], path)
+
+
+def test_admin_orders_issues_constant_statements(app):
+    admin_id = app.config["TEST_USERS"]["admin"]
+    before = statement_count(app, admin_id, "/admin/orders")
+    with app.app_context():
+        products = Product.query.all()
+        for i in range(MANY):
+            buyer = User(email=f"buyer{i}@test.local", first_name=f"Buyer{i}", last_name="T")
+            buyer.set_password("x")
+            db.session.add(buyer)
+            db.session.flush()
+            order = Order(order_number=f"T-buyer-{i}", user_id=buyer.id, total_amount=1.0,
+                          shipping=0.0, status="Paid", payment_method="card")
+            db.session.add(order)
+            db.session.flush()
+            db.session.add_all(OrderItem(order_id=order.id, product_id=p.id, user_id=buyer.id,
+                                         product_name=p.name, unit_price=p.price, quantity=1) for p in products)
+        db.session.commit()
+    assert statement_count(app, admin_id, "/admin/orders") == before
@@ -0,0 +1,49 @@
+"""Streamed uploads must not leave temp files behind, accepted or rejected."""
+import io
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("MAIL_QUEUE_WORKER", "False")
+os.environ.setdefault("CAPTCHA_POOL_SIZE", "1")
+os.environ.setdefault("CACHE_ENABLED", "False")
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+import pytest  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    folder = tempfile.mkdtemp()
+    app.config["UPLOAD_FOLDER"] = folder
+    app.config["UPLOAD_TMP_FOLDER"] = os.path.join(folder, "incoming")
+    with app.app_context():
+        admin = User(email="uploader@test.local", first_name="Up", last_name="T", is_admin=True)
+        admin.set_password("x")
+        db.session.add(admin)
+        db.session.commit()
+        app.config["TEST_ADMIN"] = admin.id
+    return app
+
+
+def test_rejected_upload_leaves_no_temp_files(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["_user_id"] = str(app.config["TEST_ADMIN"])
+        s["_fresh"] = True
+
+    response = client.post("/upload-product", content_type="multipart/form-data", data={
+        "product_name": "Mixed",
+        "price": "1",
+        "image1": (io.BytesIO(PNG), "valid.png"),
+        "image2": (io.BytesIO(b"not an image at all, just text"), "garbage.png"),
+    })
+
+    assert response.status_code == 415
+    assert os.listdir(app.config["UPLOAD_TMP_FOLDER"]) == []